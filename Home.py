@@ -1,8 +1,8 @@
 import streamlit as st
 import hashlib
-import os
 
-from database import init_db, add_user_to_db, get_user_from_db
+from app.data.migrations import run_migrations
+from app.data.users import get_user, register_user, user_exists
 from models.user import User
 
 # Page title and icon
@@ -11,31 +11,16 @@ st.set_page_config(
     page_icon="🗝️",
 )
 
-# Initialize DB
-init_db()
+# Initialize DB (runs once per server process, not on every rerun; also merges
+# the old users.db and users.txt accounts into the users table)
+@st.cache_resource
+def init_user_store():
+    run_migrations()
 
-USER_DATA_PATH = "users.txt"
+init_user_store()
 
 
 # -------- Helpers --------
-def load_users():
-    """Load users from the text file."""
-    users = {}
-    if os.path.exists(USER_DATA_PATH):
-        with open(USER_DATA_PATH, "r") as f:
-            for line in f:
-                if ":" in line:
-                    user, pw = line.strip().split(":", 1)
-                    users[user] = pw
-    return users
-
-
-def save_user_to_text(user: User):
-    """Save a User object to users.txt"""
-    with open(USER_DATA_PATH, "a") as f:
-        f.write(user.to_text_line())
-
-
 def hash_password(password):
     """Hash the password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -82,8 +67,6 @@ st.markdown("""
 # Title
 st.markdown('<h1 class="title-center">Welcome!</h1>', unsafe_allow_html=True)
 
-users = load_users()
-
 # LOGGED-IN AREA
 if st.session_state.logged_in:
     st.success(f"Logged in as **{st.session_state.username}**")
@@ -144,7 +127,7 @@ with tab_login:
 
     if st.button("Log in", key="login_btn"):
         hashed_pw = hash_password(login_password)
-        db_user = get_user_from_db(login_username)
+        db_user = get_user(login_username)  # Cached after the first lookup
 
         if db_user:
             if db_user.password == hashed_pw:
@@ -172,7 +155,7 @@ with tab_register:
             st.warning("Fill everything in.")
         elif pw != cpw:
             st.error("Passwords do not match.")
-        elif new_username in users:
+        elif user_exists(new_username):
             st.error("User already exists.")
         else:
             hashed_pw = hash_password(pw)
@@ -186,8 +169,8 @@ with tab_register:
                 last_name=last_name
             )
 
-            # Save to database and text file
-            add_user_to_db(new_user)
-            save_user_to_text(new_user)
-
-            st.success("Account created. You can now log in.")
\ No newline at end of file
+            # Save to the users table (the UNIQUE username also catches a registration race)
+            if register_user(new_user):
+                st.success("Account created. You can now log in.")
+            else:
+                st.error("User already exists.")
\ No newline at end of file
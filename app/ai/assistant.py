@@ -0,0 +1,78 @@
+"""
+Streamlit side of the AI assistants: one shared client per server process,
+configured from secrets (or environment variables):
+
+    OPENAI_API_KEY      key for the endpoint (required)
+    ASSISTANT_BASE_URL  OpenAI-compatible endpoint, e.g. a local mock server
+    ASSISTANT_MODEL     model name sent with each request
+"""
+import os
+
+import streamlit as st
+from app.ai.client import DEFAULT_BASE_URL, DEFAULT_MODEL, AssistantClient, AssistantError
+from app.ai.history import Conversation
+from app.ai.response_cache import cache_key, get_answer, put_answer
+
+
+def _setting(name, default=None):
+    """A value from st.secrets, falling back to the environment."""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except FileNotFoundError:
+        pass  # No secrets.toml at all
+    return os.environ.get(name, default)
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_client(api_key, base_url, model):
+    return AssistantClient(api_key, base_url, model)
+
+
+def get_assistant_client():
+    """The process-wide AssistantClient (its connections are reused by every session)."""
+    api_key = _setting("OPENAI_API_KEY")
+    if not api_key:
+        raise AssistantError("API key is missing. Please set OPENAI_API_KEY in secrets.")
+    return _shared_client(api_key, _setting("ASSISTANT_BASE_URL", DEFAULT_BASE_URL),
+                          _setting("ASSISTANT_MODEL", DEFAULT_MODEL))
+
+
+def get_conversation(page, system_prompt):
+    """This session's Conversation for one page; each page keeps its own history."""
+    key = f"chat_{page}"
+    if key not in st.session_state:
+        st.session_state[key] = Conversation(system_prompt)
+    return st.session_state[key]
+
+
+def _stream_and_store(client, api_messages, key, prompt, temperature, max_tokens):
+    parts = []
+    for token in client.stream(api_messages, temperature=temperature, max_tokens=max_tokens):
+        parts.append(token)
+        yield token
+    put_answer(key, client.model, prompt, "".join(parts))  # Only answers that finished are cached
+
+
+def stream_answer(messages, context, temperature=0.7, max_tokens=500):
+    """
+    Answer the last user message in messages, with context (the data shown to the model)
+    appended as a system message. The same question, after the same earlier conversation,
+    about unchanged data is served from the response cache without calling the model.
+    Returns (token generator for st.write_stream, served_from_cache).
+    """
+    client = get_assistant_client()
+    system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+    last = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=None)
+    prompt = messages[last]["content"] if last is not None else ""
+
+    # Everything before the question other than the system prompt: the summary and earlier
+    # turns, which a follow-up like "and the second one?" depends on
+    history = [m for m in messages[:last] if m["role"] != "system" or m["content"] != system_prompt]
+    key = cache_key(client.model, prompt, system_prompt, context, history)
+    answer = get_answer(key)
+    if answer is not None:
+        return iter([answer]), True
+
+    api_messages = messages + [{"role": "system", "content": context}]
+    return _stream_and_store(client, api_messages, key, prompt, temperature, max_tokens), False
@@ -0,0 +1,154 @@
+"""
+Streaming chat-completions client for the AI assistants.
+
+Requests run on one background asyncio loop with a shared httpx.AsyncClient, so
+connections are kept alive between questions and the Streamlit script thread
+never waits on the network: it just iterates tokens as they arrive. Works with
+any OpenAI-compatible endpoint (OpenRouter by default, or a local mock server).
+"""
+import asyncio
+import json
+import queue
+import threading
+
+import httpx
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "openai/gpt-3.5-turbo"
+
+CONNECT_TIMEOUT = 10   # Seconds to open a connection
+READ_TIMEOUT = 30      # Longest wait for the next chunk of a response
+TOTAL_TIMEOUT = 120    # Whole answer, start to finish
+
+_DONE = object()  # Marks the end of a stream on the token queue
+
+
+class AssistantError(Exception):
+    """The model endpoint failed, timed out or returned something unusable."""
+
+    def __init__(self, message, status=None, retryable=False):
+        super().__init__(message)
+        self.status = status        # HTTP status, if the server answered
+        self.retryable = retryable  # Rate limits, server errors and network trouble are worth retrying
+
+
+def make_http_client(api_key):
+    """An httpx.AsyncClient with the assistant's auth, timeouts and keep-alive pool."""
+    return httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {api_key}"} if api_key else {},  # The mock server needs no key
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+    )
+
+
+def _http_error(status, body):
+    message = " ".join(body.split())[:300]  # Error pages are often multi-line HTML
+    return AssistantError(f"HTTP {status}: {message}", status=status, retryable=status == 429 or status >= 500)
+
+
+async def request_completion(http, base_url, payload):
+    """POST one non-streamed chat completion and return the answer text."""
+    try:
+        response = await http.post(f"{base_url.rstrip('/')}/chat/completions", json={**payload, "stream": False})
+    except httpx.HTTPError as e:
+        raise AssistantError(f"{type(e).__name__}: {e}", retryable=True)
+    if response.status_code != 200:
+        raise _http_error(response.status_code, response.text)
+    try:
+        return response.json()["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError):
+        raise AssistantError(f"Unexpected response: {response.text[:300]}")
+
+
+class AssistantClient:
+    """One keep-alive HTTP client on a private event loop, shared by every session."""
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, total_timeout=TOTAL_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.total_timeout = total_timeout
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="assistant-client", daemon=True)
+        self._thread.start()
+
+        async def make_http():
+            return make_http_client(api_key)
+
+        # The AsyncClient must be created on the loop that will use it
+        self._http = asyncio.run_coroutine_threadsafe(make_http(), self._loop).result()
+
+    async def _stream_tokens(self, messages, temperature, max_tokens):
+        """Yield content deltas from a streamed chat completion (server-sent events)."""
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        async with self._http.stream("POST", f"{self.base_url}/chat/completions", json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", "replace")
+                raise _http_error(response.status_code, body)
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue  # Blank keep-alive lines and SSE comments
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    raise AssistantError(f"Unreadable stream chunk: {data[:100]}")
+                if "error" in chunk:
+                    raise AssistantError(str(chunk["error"]))
+                for choice in chunk.get("choices", []):
+                    token = (choice.get("delta") or {}).get("content")
+                    if token:
+                        yield token
+
+    async def _pump(self, messages, temperature, max_tokens, tokens):
+        """Run one streamed request on the loop, handing tokens (then _DONE or an error) to a queue."""
+        try:
+            async with asyncio.timeout(self.total_timeout):
+                async for token in self._stream_tokens(messages, temperature, max_tokens):
+                    tokens.put(token)
+        except TimeoutError:
+            tokens.put(AssistantError(f"No complete answer within {self.total_timeout} seconds"))
+        except httpx.HTTPError as e:
+            tokens.put(AssistantError(f"{type(e).__name__}: {e}"))
+        except AssistantError as e:
+            tokens.put(e)
+        except Exception as e:  # Anything else must still fail the answer, not end it early
+            tokens.put(AssistantError(f"{type(e).__name__}: {e}"))
+        finally:
+            tokens.put(_DONE)
+
+    def stream(self, messages, temperature=0.7, max_tokens=500):
+        """
+        Generator of answer tokens, for st.write_stream. If the consumer stops early
+        (a rerun, a click on Stop) the request is cancelled and its connection freed.
+        """
+        tokens = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(messages, temperature, max_tokens, tokens), self._loop)
+        try:
+            while True:
+                item = tokens.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, AssistantError):
+                    raise item
+                yield item
+        finally:
+            future.cancel()  # No-op if the request already finished
+
+    def complete(self, messages, temperature=0.7, max_tokens=500):
+        """The whole answer as one string."""
+        return "".join(self.stream(messages, temperature, max_tokens))
+
+    def close(self):
+        """Close pooled connections and stop the loop."""
+        asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,155 @@
+"""
+Data context sent to the assistant with a question.
+
+Built only when a question is asked: whole-table counts from the rollup
+tables first, then the rows most relevant to the question (full-text ranked,
+or keyword scored when FTS5 is missing), trimmed to a token budget. The model
+sees a summary of every row plus the detail that matters, instead of the
+first 40 rows.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+from app.ai.tokens import count_tokens
+from app.data.db import get_connection
+from app.data.frame_search import get_search_index
+from app.data.migrations import TABLE_KEYS
+from app.data.rollups import dataset_counts, incident_counts, ticket_counts
+from app.data.search import fts_available, search_table
+
+CONTEXT_TOKEN_BUDGET = 1500  # Tokens for summary plus rows
+SUMMARY_SHARE = 0.4          # At most this share of the budget goes to the whole-table summary
+DIMENSION_VALUES = 8         # Most common values listed per dimension; the rest are totalled
+CANDIDATE_ROWS = 200         # Relevant rows ranked before trimming to the budget
+MAX_CELL_CHARS = 160         # Long descriptions are cut to this length
+
+STOPWORDS = frozenset("""
+    a about all an and any are as at be by can could do does for from give has have how i in is it its
+    list me my of on or our please show should tell than that the their them there these this those to
+    was we were what when where which who why will with would you your
+""".split())
+
+# Table -> (label, date column, columns sent to the model, {dimension: counts function})
+CONTEXT_SOURCES = {
+    "cyber_incidents": (
+        "cyber incidents", "timestamp",
+        ["incident_id", "timestamp", "severity", "category", "status", "incident_type", "description"],
+        {"severity": incident_counts, "category": incident_counts, "status": incident_counts},
+    ),
+    "it_tickets": (
+        "IT tickets", "created_at",
+        ["ticket_id", "created_at", "priority", "status", "category", "assigned_to",
+         "resolution_time_hours", "subject", "description"],
+        {"priority": ticket_counts, "status": ticket_counts, "assigned_to": ticket_counts},
+    ),
+    "datasets_metadata": (
+        "datasets", "upload_date",
+        ["dataset_id", "name", "rows", "columns", "uploaded_by", "upload_date"],
+        {"uploaded_by": dataset_counts},
+    ),
+}
+
+
+def keywords(prompt):
+    """The searchable words of a question, in order, without stopwords or repeats."""
+    words = []
+    for word in re.findall(r"[a-z0-9_]+", prompt.lower()):
+        if (len(word) > 2 or word.isdigit()) and word not in STOPWORDS and word not in words:
+            words.append(word)
+    return words
+
+
+def _dimension_line(dimension, series, top=DIMENSION_VALUES):
+    """Counts for the most common values of one dimension, plus one total for the rest."""
+    series = series.sort_values(ascending=False, kind="stable")
+    line = f"By {dimension}: " + ", ".join(f"{value} {count}" for value, count in series.head(top).items())
+    if len(series) > top:
+        line += f", {len(series) - top} others {series.iloc[top:].sum()}"
+    return line
+
+
+def summarize_table(table, max_tokens=None):
+    """
+    Row count, date range and per-dimension counts for the whole table, as short text lines;
+    dimension lines that would take it past max_tokens are left out.
+    """
+    label, date_column, _, dimensions = CONTEXT_SOURCES[table]
+    with get_connection() as conn:
+        total, first, last = conn.execute(
+            f"SELECT COUNT(*), MIN({date_column}), MAX({date_column}) FROM {table}"
+        ).fetchone()
+
+    lines = [f"{total} {label} in total" + (f", dated {first} to {last}." if first else ".")]
+    used = count_tokens(lines[0])
+    for dimension, counts in dimensions.items():
+        line = _dimension_line(dimension, counts(dimension))
+        cost = count_tokens(line) + 1
+        if max_tokens is not None and used + cost > max_tokens:
+            continue  # A shorter line for a later dimension may still fit
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def relevant_rows(table, prompt, df=None, limit=CANDIDATE_ROWS):
+    """
+    Rows most relevant to prompt, best first: full-text ranked (any keyword), else scored by
+    how many keywords each row of df contains, else the most recent rows.
+    """
+    _, _, columns, _ = CONTEXT_SOURCES[table]
+    key_column = TABLE_KEYS[table]
+    words = keywords(prompt)
+
+    if words and fts_available(table):
+        rows = search_table(table, " ".join(words), limit=limit, match_all=False)
+        if not rows.empty:
+            return rows
+
+    if words and df is not None and not df.empty:
+        index = get_search_index(df, [column for column in columns if column in df.columns])
+        scores = np.sum([index.mask(word) for word in words], axis=0)
+        matched = np.flatnonzero(scores)
+        if len(matched):
+            best = matched[np.argsort(-scores[matched], kind="stable")][:limit]
+            return df.iloc[best]
+
+    if df is not None:
+        return df.nlargest(limit, key_column)
+    with get_connection() as conn:
+        return pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {key_column} DESC LIMIT ?", conn, params=(limit,))
+
+
+def _rows_to_lines(rows, columns):
+    """CSV lines (header first) for the chosen columns, one per row, with long text cut short."""
+    rows = rows[[column for column in columns if column in rows.columns]].copy()
+    for column in rows.columns:
+        if pd.api.types.is_string_dtype(rows[column]):
+            # Newlines inside a cell would split its row across two lines
+            rows[column] = rows[column].str.replace(r"\s+", " ", regex=True).str.slice(0, MAX_CELL_CHARS)
+    return rows.to_csv(index=False).splitlines()
+
+
+def build_context(table, prompt, df=None, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    The data context for one question about table: the whole-table summary, then as many
+    of the most relevant rows as fit in budget tokens.
+    """
+    label, _, columns, _ = CONTEXT_SOURCES[table]
+    summary = summarize_table(table, max_tokens=int(budget * SUMMARY_SHARE))
+    header = (
+        f"Summary of all {label}:\n{summary}\n\n"
+        f"The {label} most relevant to the question (CSV, best match first):\n"
+    )
+
+    lines = _rows_to_lines(relevant_rows(table, prompt, df), columns)
+    kept = []
+    used = count_tokens(header)
+    for line in lines:
+        cost = count_tokens(line) + 1  # +1 for the newline
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+
+    return header + "\n".join(kept)
@@ -0,0 +1,70 @@
+"""
+Bounded chat history for the assistants.
+
+Each page keeps its own Conversation. Recent messages are sent verbatim up to
+a token budget; older ones are folded into a short running summary, so the
+request size stays flat however long the chat goes on.
+"""
+from collections import deque
+
+from app.ai.tokens import count_tokens, message_tokens
+
+WINDOW_TOKENS = 1200      # Recent messages sent verbatim
+SUMMARY_TOKENS = 300      # Running summary of the older messages
+MIN_RECENT_MESSAGES = 2   # Always send at least the last question and answer
+TRANSCRIPT_MESSAGES = 60  # Messages kept for display on the page
+SUMMARY_LINE_CHARS = 200  # Each folded message contributes at most this much text
+
+
+class Conversation:
+    """One page's chat: a system prompt, a running summary and a token-bounded window of messages."""
+
+    def __init__(self, system_prompt, window_tokens=WINDOW_TOKENS, summary_tokens=SUMMARY_TOKENS):
+        self.system_prompt = system_prompt
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.clear()
+
+    def clear(self):
+        self.window = deque()     # {"role", "content", "tokens"} sent with every request
+        self.summary = deque()    # One short line per folded message, oldest first
+        self.folded = 0           # Messages folded into the summary so far
+        self.transcript = deque(maxlen=TRANSCRIPT_MESSAGES)  # What the page shows
+
+    def add(self, role, content):
+        """Record a message, folding the oldest ones into the summary if the window is over budget."""
+        message = {"role": role, "content": content, "tokens": message_tokens({"content": content})}
+        self.window.append(message)
+        self.transcript.append(message)
+
+        while len(self.window) > MIN_RECENT_MESSAGES and self.window_size() > self.window_tokens:
+            self._fold(self.window.popleft())
+
+    def _fold(self, message):
+        text = " ".join(message["content"].split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "..."
+        self.summary.append(f"{'User asked' if message['role'] == 'user' else 'You answered'}: {text}")
+        self.folded += 1
+
+        # The summary is bounded too: the oldest lines go first
+        while len(self.summary) > 1 and count_tokens("\n".join(self.summary)) > self.summary_tokens:
+            self.summary.popleft()
+
+    def window_size(self):
+        return sum(message["tokens"] for message in self.window)
+
+    def api_messages(self):
+        """Messages to send: system prompt, summary of older turns (if any), recent messages."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": "Summary of the earlier conversation:\n" + "\n".join(self.summary),
+            })
+        messages.extend({"role": message["role"], "content": message["content"]} for message in self.window)
+        return messages
+
+    def request_tokens(self):
+        """Tokens the history adds to each request (before the data context)."""
+        return sum(message_tokens(message) for message in self.api_messages())
@@ -0,0 +1,105 @@
+"""
+Minimal OpenAI-compatible chat server for trying the assistants offline.
+
+    python -m app.ai.mock_server --port 8765
+    ASSISTANT_BASE_URL=http://127.0.0.1:8765/v1 streamlit run Home.py
+
+It echoes the last user message back, one word per streamed chunk, and
+answers batch triage requests (app.ai.triage) with well-formed JSON.
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+    delay = 0.02                   # Seconds between streamed words
+    fail_rate = 0.0                # Share of requests answered with 429 or 500, to exercise retries
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if random.random() < self.fail_rate:
+            self.send_error(random.choice((429, 500)))
+            return
+
+        messages = request.get("messages", [])
+        prompt = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        if messages and messages[0]["content"].startswith("You triage"):
+            words = [self._triage_answer(prompt)]
+        else:
+            words = f"Mock answer to: {prompt}".split(" ")
+        model = request.get("model", "mock")
+
+        if not request.get("stream"):
+            body = json.dumps({
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words)},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            token = word if i == 0 else " " + word
+            self._send_chunk(f"data: {json.dumps({'model': model, 'choices': [{'delta': {'content': token}}]})}\n\n")
+            time.sleep(self.delay)
+        self._send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _triage_answer(prompt):
+        """A JSON array with one plausible triage object per row in the request."""
+        rows = json.loads(prompt.split("Rows:\n", 1)[1])
+        results = []
+        for row in rows:
+            text = json.dumps(row).lower()
+            results.append({
+                "id": row["id"],
+                "mitre_technique": "T1566 Phishing" if "phish" in text else "T1499 Endpoint Denial of Service"
+                if "ddos" in text else "N/A",
+                "suggested_priority": "High" if "high" in text or "critical" in text else "Medium",
+                "summary": f"Mock triage of row {row['id']}.",
+            })
+        return json.dumps(results)
+
+    def _send_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.ai.mock_server [--port PORT] [--delay SECONDS]"""
+    parser = argparse.ArgumentParser(description="Serve fake streamed chat completions.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=MockChatHandler.delay, help="Seconds between words")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests that fail with 429/500")
+    args = parser.parse_args(argv)
+
+    MockChatHandler.delay = args.delay
+    MockChatHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockChatHandler)
+    print(f"Mock chat server on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
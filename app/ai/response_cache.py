@@ -0,0 +1,153 @@
+"""
+Persistent cache of assistant answers (DATA/assistant_cache.db).
+
+An answer is reused when the model, the normalised question, the system prompt,
+the earlier conversation and the data sent with it are all unchanged. Entries
+expire after a TTL and the least recently used ones are evicted beyond a size
+limit. Hit and miss counters are kept in the same file:
+
+    python -m app.ai.response_cache            # show hit rate and size
+    python -m app.ai.response_cache --clear
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+
+from app.data.db import DATA_DIR, close_all_pools, get_connection
+
+CACHE_DB_PATH = DATA_DIR / "assistant_cache.db"
+MAX_ENTRIES = 2000          # Least recently used answers beyond this are evicted
+TTL_SECONDS = 24 * 60 * 60  # Answers older than a day are asked again
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS assistant_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_assistant_cache_last_used ON assistant_cache(last_used);
+    CREATE TABLE IF NOT EXISTS assistant_cache_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+"""
+
+_ready = set()  # Cache files whose tables exist
+_ready_lock = threading.Lock()
+
+
+def _connection(db_path):
+    """Pooled connection to the cache file, creating its tables on first use."""
+    if db_path not in _ready:
+        with _ready_lock, get_connection(db_path) as conn:
+            conn.executescript(_SCHEMA)
+            _ready.add(db_path)
+    return get_connection(db_path)
+
+
+def normalize_prompt(prompt):
+    """Case, surrounding whitespace and trailing punctuation don't make a question different."""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip("?!. ").lower()
+
+
+def cache_key(model, prompt, system_prompt, context, history=()):
+    """
+    Key for one question: model, normalised prompt, system prompt and hashes of the data
+    context and of the earlier messages (summary and previous turns) it is asked after.
+    """
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    history_hash = hashlib.sha256(json.dumps(list(history)).encode("utf-8")).hexdigest()
+    parts = json.dumps([model, normalize_prompt(prompt), system_prompt, context_hash, history_hash])
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+
+def _count(conn, name, amount=1):
+    conn.execute(
+        "INSERT INTO assistant_cache_stats (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount),
+    )
+
+
+def get_answer(key, ttl=TTL_SECONDS, db_path=CACHE_DB_PATH):
+    """The cached answer for key, or None (expired entries count as misses and are dropped)."""
+    now = time.time()
+    with _connection(db_path) as conn:
+        row = conn.execute("SELECT answer, created_at FROM assistant_cache WHERE cache_key = ?", (key,)).fetchone()
+        if row is None or row[1] < now - ttl:
+            if row is not None:
+                conn.execute("DELETE FROM assistant_cache WHERE cache_key = ?", (key,))
+            _count(conn, "misses")
+            return None
+
+        conn.execute("UPDATE assistant_cache SET last_used = ?, hits = hits + 1 WHERE cache_key = ?", (now, key))
+        _count(conn, "hits")
+        return row[0]
+
+
+def put_answer(key, model, prompt, answer, max_entries=MAX_ENTRIES, db_path=CACHE_DB_PATH):
+    """Store an answer, then evict the least recently used entries beyond max_entries."""
+    now = time.time()
+    with _connection(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO assistant_cache (cache_key, model, prompt, answer, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, prompt, answer, now, now),
+        )
+        evicted = conn.execute(
+            "DELETE FROM assistant_cache WHERE cache_key IN ("
+            "  SELECT cache_key FROM assistant_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        ).rowcount
+        if evicted:
+            _count(conn, "evictions", evicted)
+
+
+def cache_stats(db_path=CACHE_DB_PATH):
+    """{"hits", "misses", "hit_rate", "evictions", "entries"} for the cache file."""
+    with _connection(db_path) as conn:
+        counters = dict(conn.execute("SELECT name, value FROM assistant_cache_stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM assistant_cache").fetchone()[0]
+
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "evictions": counters.get("evictions", 0),
+        "entries": entries,
+    }
+
+
+def clear_cache(db_path=CACHE_DB_PATH):
+    """Drop every cached answer and reset the counters."""
+    with _connection(db_path) as conn:
+        conn.execute("DELETE FROM assistant_cache")
+        conn.execute("DELETE FROM assistant_cache_stats")
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.ai.response_cache [--clear]"""
+    parser = argparse.ArgumentParser(description="Show or clear the assistant response cache.")
+    parser.add_argument("--clear", action="store_true", help="Remove every cached answer")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.clear:
+            clear_cache()
+        stats = cache_stats()
+        print(f"{stats['entries']} answers cached; {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
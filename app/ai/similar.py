@@ -0,0 +1,396 @@
+"""
+"Find incidents like this one": similarity search over description text.
+
+Rows are embedded with a hashing TF-IDF vectorizer (word and word-pair
+features hashed into a fixed number of dimensions, so there is no vocabulary
+or model to download) and stored as a float32 matrix in DATA/embeddings/,
+which queries memory-map. Vectors are unit length, so cosine similarity is a
+matrix product, done a block of rows at a time for any number of queries.
+New, edited and deleted rows are applied incrementally through the same
+delta read FrameSync uses (read_changes):
+
+    python -m app.ai.similar --rebuild
+    python -m app.ai.similar --query "ransomware encrypted the file share"
+    python -m app.ai.similar --tables it_tickets --like 2042
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from app.ai.context import STOPWORDS
+from app.data.csv_store import file_lock
+from app.data.db import DATA_DIR, close_all_pools, get_connection
+from app.data.delta import log_positions, read_changes
+from app.data.migrations import TABLE_KEYS, run_migrations
+from app.data.versions import table_version
+
+EMBEDDINGS_DIR = DATA_DIR / "embeddings"
+DIMENSIONS = 256        # Hashed features per vector
+TOP_K = 5
+BLOCK_ROWS = 1 << 17    # Matrix rows scored per matrix product
+BATCH_ROWS = 20000      # Rows embedded at a time during a rebuild
+MIN_CAPACITY = 1024     # The matrix grows by doubling, so appends rarely copy it
+
+# Table -> text columns embedded for each row
+EMBEDDING_SOURCES = {
+    "cyber_incidents": ["incident_type", "category", "description"],
+    "it_tickets": ["subject", "category", "description"],
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _features(text):
+    """Words (without stopwords) and adjacent word pairs of text."""
+    words = [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash(feature):
+    """(dimension, sign) of a feature; crc32 is stable across processes, unlike hash()."""
+    value = zlib.crc32(feature.encode("utf-8"))
+    return value % DIMENSIONS, 1.0 if value & 0x80000000 else -1.0
+
+
+def term_vectors(texts):
+    """Sublinear (1 + log) hashed term frequencies, one float32 row per text, not yet IDF-weighted."""
+    positions, weights = [], []
+    for row, text in enumerate(texts):
+        for feature in _features(text or ""):
+            dimension, sign = _hash(feature)
+            positions.append(row * DIMENSIONS + dimension)
+            weights.append(sign)
+
+    # Signed hashing: features that collide in a dimension mostly cancel out instead of piling up
+    counts = np.bincount(positions, weights=weights, minlength=len(texts) * DIMENSIONS)
+    counts = counts.reshape(len(texts), DIMENSIONS).astype(np.float32)
+    return np.sign(counts) * np.log1p(np.abs(counts))
+
+
+def normalize(vectors, idf):
+    """IDF-weight vectors and scale each to unit length (all-zero rows stay zero)."""
+    vectors = vectors * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def embed_texts(texts, idf):
+    """Unit-length float32 vectors for texts."""
+    return normalize(term_vectors(texts), idf)
+
+
+def _row_text(values):
+    """The non-empty cells of a row as one string (None from SQLite, NaN from pandas)."""
+    return " ".join(str(value) for value in values if value is not None and not pd.isna(value) and value != "")
+
+
+class SimilarityIndex:
+    """Embeddings of one table's rows on disk, memory-mapped for queries and kept current by deltas."""
+
+    def __init__(self, table, directory=EMBEDDINGS_DIR):
+        self.table = table
+        self.key_column = TABLE_KEYS[table]
+        self.columns = EMBEDDING_SOURCES[table]
+        self.matrix_path = directory / f"{table}.npy"  # float32 (capacity, DIMENSIONS)
+        self.ids_path = directory / f"{table}.ids.npy"  # int64 key per matrix row; -1 = deleted or unused
+        self.meta_path = directory / f"{table}.json"
+        self.meta = None          # rows, high_water, tombstone_seq, update_seq, version, idf
+        self.matrix = None
+        self.ids = None
+        self.idf = None
+        self._lock = threading.RLock()  # Shared between sessions; one update at a time
+
+    # ----- Files -----
+
+    def _open(self):
+        """Map the files read-only, as described by the meta file. Returns False if there is no index."""
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            ids = np.load(self.ids_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return False
+        if matrix.shape[1] != DIMENSIONS or "update_seq" not in meta:
+            return False  # Built with another vector size, or before edits were logged
+        self.meta, self.matrix, self.ids = meta, matrix, ids
+        self.idf = np.asarray(meta["idf"], dtype=np.float32)
+        return True
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)  # Readers see the old meta or the new one, never half
+
+    def _new_files(self, capacity):
+        """Empty matrix and ID files (as temp files) with room for capacity rows."""
+        matrix_tmp = self.matrix_path.with_name(self.matrix_path.name + ".tmp")
+        ids_tmp = self.ids_path.with_name(self.ids_path.name + ".tmp")
+        matrix = np.lib.format.open_memmap(matrix_tmp, mode="w+", dtype=np.float32, shape=(capacity, DIMENSIONS))
+        ids = np.lib.format.open_memmap(ids_tmp, mode="w+", dtype=np.int64, shape=(capacity,))
+        ids[:] = -1
+        return matrix, ids, matrix_tmp, ids_tmp
+
+    def _replace_files(self, matrix_tmp, ids_tmp):
+        """Move finished temp files into place (callers flush and drop their maps first)."""
+        self.matrix = self.ids = None  # Release our maps of the old files too
+        os.replace(matrix_tmp, self.matrix_path)
+        os.replace(ids_tmp, self.ids_path)
+
+    # ----- Building and updating -----
+
+    def rebuild(self):
+        """Embed every row of the table from scratch (and recompute the IDF weights)."""
+        with self._lock:
+            self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.matrix_path):
+                return self._rebuild()
+
+    def _rebuild(self):
+        columns = ", ".join([self.key_column] + self.columns)
+        with get_connection() as conn:
+            conn.execute("BEGIN")  # One snapshot for the rows and the marks
+            total = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            tombstone_seq, update_seq = log_positions(conn, self.table)
+            version = conn.execute(
+                "SELECT version FROM table_versions WHERE table_name = ?", (self.table,)
+            ).fetchone()[0]
+
+            matrix, ids, matrix_tmp, ids_tmp = self._new_files(max(MIN_CAPACITY, total + total // 4))
+            document_frequency = np.zeros(DIMENSIONS, dtype=np.int64)
+            rows = 0
+            cursor = conn.execute(f"SELECT {columns} FROM {self.table} ORDER BY {self.key_column}")
+            while batch := cursor.fetchmany(BATCH_ROWS):
+                vectors = term_vectors([_row_text(row[1:]) for row in batch])
+                matrix[rows:rows + len(batch)] = vectors
+                ids[rows:rows + len(batch)] = [row[0] for row in batch]
+                document_frequency += np.count_nonzero(vectors, axis=0)
+                rows += len(batch)
+
+        # Smoothed IDF, then weight and normalise the stored rows a block at a time
+        idf = (np.log((1 + rows) / (1 + document_frequency)) + 1).astype(np.float32)
+        for start in range(0, rows, BLOCK_ROWS):
+            matrix[start:start + BLOCK_ROWS] = normalize(matrix[start:start + BLOCK_ROWS], idf)
+
+        high_water = int(ids[rows - 1]) if rows else 0
+        matrix.flush()
+        ids.flush()
+        del matrix, ids
+        self._replace_files(matrix_tmp, ids_tmp)
+        self._write_meta({
+            "rows": rows,
+            "high_water": high_water,
+            "tombstone_seq": tombstone_seq,
+            "update_seq": update_seq,
+            "version": version,
+            "idf": idf.tolist(),
+        })
+        self._open()
+        return {"added": rows, "updated": 0, "removed": 0, "rebuilt": True}
+
+    def update(self):
+        """
+        Embed rows added above the high-water mark, re-embed edited ones and blank out deleted
+        ones; builds the index if there is none.
+        Returns {"added": n, "updated": u, "removed": m, "rebuilt": bool}.
+        """
+        with self._lock:
+            if self.meta is not None and table_version(self.table) == self.meta["version"]:
+                return {"added": 0, "updated": 0, "removed": 0, "rebuilt": False}  # Nothing changed
+
+            self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.matrix_path):
+                # Another process may have updated (or rebuilt) the files since we mapped them
+                if not self._open():
+                    return self._rebuild()
+                if table_version(self.table) == self.meta["version"]:
+                    return {"added": 0, "updated": 0, "removed": 0, "rebuilt": False}
+                return self._update()
+
+    def _update(self):
+        meta = dict(self.meta)
+        rows = meta["rows"]
+        with get_connection() as conn:
+            added = conn.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE {self.key_column} > ?", (meta["high_water"],)
+            ).fetchone()[0]
+        if added > rows:
+            return self._rebuild()  # Mostly new text: worth fresh IDF weights too
+
+        changes = read_changes(
+            self.table, meta["high_water"], meta["tombstone_seq"], meta["update_seq"],
+            columns=[self.key_column] + self.columns,
+        )
+        new_rows = changes["rows"]
+        if rows + len(new_rows) > len(self.ids):
+            self._grow(max(len(self.ids) * 2, rows + len(new_rows)))
+        matrix = np.load(self.matrix_path, mmap_mode="r+")
+        ids = np.load(self.ids_path, mmap_mode="r+")
+
+        # Deleted rows are blanked; edited ones too, then embedded again at the end
+        removed = updated = 0
+        if changes["deleted"] or changes["edited"]:
+            stored = ids[:rows]
+            removed = int(np.isin(stored, list(changes["deleted"])).sum())
+            updated = int(np.isin(stored, list(changes["edited"] - changes["deleted"])).sum())
+            positions = np.flatnonzero(np.isin(stored, list(changes["deleted"] | changes["edited"])))
+            matrix[positions] = 0
+            ids[positions] = -1
+
+        keys = new_rows[self.key_column].to_numpy()
+        texts = [_row_text(row) for row in new_rows[self.columns].itertuples(index=False, name=None)]
+        for start in range(0, len(texts), BATCH_ROWS):
+            batch = texts[start:start + BATCH_ROWS]
+            matrix[rows:rows + len(batch)] = embed_texts(batch, self.idf)
+            ids[rows:rows + len(batch)] = keys[start:start + BATCH_ROWS]
+            rows += len(batch)
+        if len(keys):
+            meta["high_water"] = max(meta["high_water"], int(keys.max()))
+
+        matrix.flush()
+        ids.flush()
+        # Rows imported with IDs below the mark aren't visible as a delta; and once most
+        # slots are blanked (deletes and edits), a rebuild is smaller and faster to scan
+        live = np.count_nonzero(ids[:rows] >= 0)
+        if live != changes["total_rows"] or rows - live > max(live, MIN_CAPACITY):
+            del matrix, ids
+            return self._rebuild()
+
+        meta.update(
+            rows=rows, tombstone_seq=changes["tombstone_seq"], update_seq=changes["update_seq"],
+            version=changes["version"],
+        )
+        self._write_meta(meta)
+        self._open()
+        return {"added": added, "updated": updated, "removed": removed, "rebuilt": False}
+
+    def _grow(self, capacity):
+        """Copy the stored rows into larger files."""
+        rows = self.meta["rows"]
+        matrix, ids, matrix_tmp, ids_tmp = self._new_files(capacity)
+        matrix[:rows] = self.matrix[:rows]
+        ids[:rows] = self.ids[:rows]
+        matrix.flush()
+        ids.flush()
+        del matrix, ids
+        self._replace_files(matrix_tmp, ids_tmp)
+
+    # ----- Queries -----
+
+    def _snapshot(self):
+        """
+        (rows, matrix, ids, idf) of the current index, taken together under the lock so a
+        concurrent update can't swap the files between them; None if there is no index.
+        """
+        with self._lock:
+            if self.meta is None and not self._open():
+                return None
+            return self.meta["rows"], self.matrix, self.ids, self.idf
+
+    def search(self, vectors, k=TOP_K, exclude=None):
+        """
+        Top-k cosine matches for each query vector: a list (one per query) of
+        [(row_id, similarity), ...], best first. exclude is an optional row ID per query to leave out.
+        """
+        return self._search(self._snapshot(), vectors, k, exclude)
+
+    def _search(self, snapshot, vectors, k, exclude):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if snapshot is None or not snapshot[0]:
+            return [[] for _ in vectors]
+        rows, matrix, ids, _ = snapshot
+        want = k + 1 if exclude is not None else k
+
+        # Best candidates of each block, then the best of those
+        candidate_scores, candidate_positions = [], []
+        for start in range(0, rows, BLOCK_ROWS):
+            scores = vectors @ matrix[start:min(start + BLOCK_ROWS, rows)].T  # (queries, block rows)
+            top = min(want, scores.shape[1])
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            candidate_scores.append(np.take_along_axis(scores, best, axis=1))
+            candidate_positions.append(best + start)
+        scores = np.concatenate(candidate_scores, axis=1)
+        positions = np.concatenate(candidate_positions, axis=1)
+
+        results = []
+        for query, order in enumerate(np.argsort(-scores, axis=1)):
+            matches = []
+            for column in order:
+                row_id, score = int(ids[positions[query, column]]), float(scores[query, column])
+                if score <= 0 or len(matches) == k:
+                    break  # Deleted rows have zero vectors, so they never score above 0
+                if row_id >= 0 and (exclude is None or row_id != exclude[query]):
+                    matches.append((row_id, score))
+            results.append(matches)
+        return results
+
+    def query(self, texts, k=TOP_K):
+        """Top-k rows most similar to each text (see search)."""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return [[] for _ in texts]
+        return self._search(snapshot, embed_texts(texts, snapshot[3]), k, None)
+
+    def similar_to(self, row_id, k=TOP_K):
+        """Top-k rows most similar to an indexed row, excluding itself; None if row_id isn't indexed."""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return None
+        rows, matrix, ids, _ = snapshot
+        positions = np.flatnonzero(ids[:rows] == row_id)
+        if not len(positions):
+            return None
+        return self._search(snapshot, matrix[positions[0]], k, [row_id])[0]
+
+
+def matching_rows(df, table, matches):
+    """The rows of df for matches, best first, with a similarity column in front."""
+    key_column = TABLE_KEYS[table]
+    ranked = pd.DataFrame(matches, columns=[key_column, "similarity"])
+    return ranked.merge(df, on=key_column, how="inner")
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.ai.similar [--rebuild] [--query TEXT | --like ID]"""
+    parser = argparse.ArgumentParser(description="Build the similarity index or query it.")
+    parser.add_argument("--tables", nargs="+", choices=EMBEDDING_SOURCES, default=list(EMBEDDING_SOURCES))
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every row instead of applying changes")
+    parser.add_argument("--query", help="Show the rows most similar to this text")
+    parser.add_argument("--like", type=int, help="Show the rows most similar to this row ID")
+    parser.add_argument("-k", type=int, default=TOP_K, help=f"Matches to show (default {TOP_K})")
+    args = parser.parse_args(argv)
+
+    try:
+        run_migrations()
+        for table in args.tables:
+            index = SimilarityIndex(table)
+            start = time.perf_counter()
+            stats = index.rebuild() if args.rebuild else index.update()
+            print(f"{table}: {stats['added']} embedded, {stats['updated']} re-embedded, {stats['removed']} removed "
+                  f"({'full build, ' if stats['rebuilt'] else ''}{time.perf_counter() - start:.2f}s)")
+
+            if args.query or args.like is not None:
+                start = time.perf_counter()
+                matches = index.query([args.query], args.k)[0] if args.query else index.similar_to(args.like, args.k)
+                elapsed = (time.perf_counter() - start) * 1000
+                if matches is None:
+                    print(f"  {args.like} is not in the index")
+                    continue
+                print(f"  {len(matches)} matches in {elapsed:.1f}ms")
+                for row_id, score in matches:
+                    print(f"  {row_id}  {score:.3f}")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Token counting for assistant payloads.
+
+Uses tiktoken when it is installed; otherwise about four characters per
+token, which is close enough for English text and CSV for budgeting.
+"""
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:  # Optional
+    _encoding = None
+
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    """Approximate number of model tokens in text."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(message):
+    """Tokens one chat message costs, including the few the role and framing add."""
+    return count_tokens(message["content"]) + 4
@@ -0,0 +1,224 @@
+"""
+Batch AI triage of incidents and tickets.
+
+Rows with no ai_triage entry are packed several to a request and sent to the
+model by a bounded pool of workers, under a requests-per-minute limit, with
+retries and exponential backoff. Each answer is written back as soon as it
+arrives, so an interrupted run simply picks up the rows that are still
+unlabelled:
+
+    python -m app.ai.triage --workers 4 --batch-size 8 --rpm 60
+    python -m app.ai.triage --base-url http://127.0.0.1:8765/v1   # against app.ai.mock_server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from app.ai.client import DEFAULT_BASE_URL, DEFAULT_MODEL, AssistantError, make_http_client, request_completion
+from app.data.db import close_all_pools, get_connection
+from app.data.migrations import TABLE_KEYS, TRIAGE_TABLES, run_migrations
+
+BATCH_SIZE = 8        # Rows packed into one request
+WORKERS = 4           # Requests in flight at once
+REQUESTS_PER_MINUTE = 60
+MAX_ATTEMPTS = 4      # Per batch, including the first
+BACKOFF_SECONDS = 2   # First retry delay; doubles each time (plus jitter)
+MAX_DESCRIPTION_CHARS = 400
+
+PRIORITIES = ("Low", "Medium", "High", "Critical")
+
+TRIAGE_SYSTEM_PROMPT = (
+    "You triage security incidents and IT tickets. For every row you are given, reply with one "
+    "JSON object: {\"id\": <row id>, \"mitre_technique\": \"<ATT&CK technique ID and name, or N/A>\", "
+    "\"suggested_priority\": \"Low|Medium|High|Critical\", \"summary\": \"<one sentence>\"}. "
+    "Reply with a JSON array of these objects only, one per row, no other text."
+)
+
+# Table -> columns sent to the model for each row
+TRIAGE_COLUMNS = {
+    "cyber_incidents": ["incident_id", "timestamp", "severity", "category", "status", "incident_type", "description"],
+    "it_tickets": ["ticket_id", "created_at", "priority", "status", "category", "subject", "description"],
+}
+
+
+def unlabelled_rows(table, limit=None):
+    """Rows of table that have no ai_triage result yet, oldest ID first, as dicts."""
+    key_column = TABLE_KEYS[table]
+    columns = ", ".join(f"t.{column}" for column in TRIAGE_COLUMNS[table])
+    query = f"""
+        SELECT {columns}
+        FROM {table} AS t
+        LEFT JOIN ai_triage AS a ON a.table_name = ? AND a.row_id = t.{key_column}
+        WHERE a.row_id IS NULL
+        ORDER BY t.{key_column}
+    """ + (" LIMIT ?" if limit else "")
+    params = (table, limit) if limit else (table,)
+    with get_connection() as conn:
+        cursor = conn.execute(query, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def build_request(table, rows):
+    """Chat messages asking the model to triage one batch of rows."""
+    key_column = TABLE_KEYS[table]
+    packed = []
+    for row in rows:
+        item = {"id": row[key_column], **{k: v for k, v in row.items() if k != key_column and v not in (None, "")}}
+        if "description" in item:
+            item["description"] = str(item["description"])[:MAX_DESCRIPTION_CHARS]
+        packed.append(item)
+    kind = "incidents" if table == "cyber_incidents" else "IT tickets"
+    return [
+        {"role": "system", "content": TRIAGE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Triage these {kind}. Rows:\n{json.dumps(packed, default=str)}"},
+    ]
+
+
+def parse_results(answer, rows, table):
+    """
+    The triage objects in a model answer, keyed by row ID. Only IDs that were in the batch
+    are kept; an unknown priority is dropped rather than stored.
+    """
+    match = re.search(r"\[.*\]", answer, re.DOTALL)  # Tolerates code fences and stray text
+    if not match:
+        raise AssistantError("Answer contained no JSON array")
+    try:
+        items = json.loads(match.group(0))
+    except ValueError as e:
+        raise AssistantError(f"Answer was not valid JSON: {e}")
+
+    wanted = {row[TABLE_KEYS[table]] for row in rows}
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            row_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if row_id not in wanted:
+            continue
+        priority = str(item.get("suggested_priority", "")).strip().capitalize()
+        results[row_id] = (
+            str(item.get("mitre_technique") or "N/A")[:200],
+            priority if priority in PRIORITIES else None,
+            str(item.get("summary") or "")[:500],
+        )
+    return results
+
+
+def save_results(table, results, model):
+    """Write a batch of triage results (INSERT OR REPLACE: a re-triaged row keeps the newest)."""
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO ai_triage (table_name, row_id, mitre_technique, suggested_priority, summary, model) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(table, row_id, *values, model) for row_id, values in results.items()],
+        )
+
+
+class RateLimiter:
+    """Spaces request starts evenly so no more than per_minute begin in any minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _triage_batch(http, limiter, args, table, rows, stats):
+    """Send one batch, retrying with backoff, and store what comes back."""
+    payload = {
+        "model": args.model,
+        "messages": build_request(table, rows),
+        "temperature": 0,
+        "max_tokens": 120 * len(rows),
+    }
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await limiter.wait()
+        try:
+            answer = await request_completion(http, args.base_url, payload)
+            results = parse_results(answer, rows, table)
+            break
+        except AssistantError as e:
+            # A malformed answer may come out right on a second try; a 4xx other than 429 won't
+            if attempt == MAX_ATTEMPTS or (e.status is not None and not e.retryable):
+                stats["failed"] += len(rows)
+                print(f"{table}: batch starting at {rows[0][TABLE_KEYS[table]]} failed: {e}")
+                return
+            delay = BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    save_results(table, results, args.model)
+    stats["labelled"] += len(results)
+    stats["missing"] += len(rows) - len(results)  # Left unlabelled; picked up by the next run
+
+
+async def run_triage(args):
+    """Triage every unlabelled row of the chosen tables; returns counts."""
+    stats = {"labelled": 0, "missing": 0, "failed": 0, "retries": 0}
+    batches = asyncio.Queue()
+    for table in args.tables:
+        rows = unlabelled_rows(table, args.limit)
+        for start in range(0, len(rows), args.batch_size):
+            batches.put_nowait((table, rows[start:start + args.batch_size]))
+    if batches.empty():
+        return stats
+
+    limiter = RateLimiter(args.rpm)
+    async with make_http_client(args.api_key) as http:
+
+        async def worker():
+            while True:
+                try:
+                    table, rows = batches.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await _triage_batch(http, limiter, args, table, rows, stats)
+
+        await asyncio.gather(*(worker() for _ in range(min(args.workers, batches.qsize()))))
+    return stats
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.ai.triage [options]"""
+    parser = argparse.ArgumentParser(description="Label unlabelled incidents and tickets with the AI model.")
+    parser.add_argument("--tables", nargs="+", choices=TRIAGE_TABLES, default=list(TRIAGE_TABLES))
+    parser.add_argument("--limit", type=int, help="At most this many rows per table (default all)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"Rows per request (default {BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Requests in flight (default {WORKERS})")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE,
+                        help=f"Requests per minute (default {REQUESTS_PER_MINUTE})")
+    parser.add_argument("--base-url", default=os.environ.get("ASSISTANT_BASE_URL", DEFAULT_BASE_URL),
+                        help="OpenAI-compatible endpoint, e.g. the local mock server")
+    parser.add_argument("--model", default=os.environ.get("ASSISTANT_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""),
+                        help="Defaults to the OPENAI_API_KEY environment variable")
+    args = parser.parse_args(argv)
+
+    try:
+        run_migrations()
+        start = time.perf_counter()
+        stats = asyncio.run(run_triage(args))
+        print(f"Labelled {stats['labelled']} rows in {time.perf_counter() - start:.1f}s "
+              f"({stats['failed']} failed, {stats['missing']} left out of answers, {stats['retries']} retries)")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from itertools import islice
+
+import pandas as pd
+from app.data.db import DB_PATH, get_connection, get_pool
+
+BULK_CHUNK_SIZE = 5000  # Rows written per transaction
+
+
+def _convert_column(series, kind):
+    """Vectorised conversion of one column to a SQLite-friendly Python type."""
+    if kind == "int":
+        series = pd.to_numeric(series, errors="coerce").round().astype("Int64")
+    elif kind == "float":
+        series = pd.to_numeric(series, errors="coerce")
+    elif kind == "timestamp":
+        # Sortable ISO text so range filters and ORDER BY work on the raw column
+        series = pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
+    elif kind == "date":
+        series = pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d")
+    else:
+        series = series.where(series.isna(), series.astype(str))
+
+    # NaN / NaT / <NA> all become NULL; everything else a plain Python scalar
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def frame_to_rows(df, column_types):
+    """
+    Turn a DataFrame into a list of typed row tuples.
+    column_types maps each table column to "int", "float", "text", "timestamp" or "date";
+    columns missing from the frame are filled with NULL.
+    """
+    columns = []
+    for column, kind in column_types.items():
+        if column in df.columns:
+            columns.append(_convert_column(df[column], kind))
+        else:
+            columns.append([None] * len(df))
+    return list(zip(*columns))
+
+
+def bulk_upsert(table, columns, rows, conflict_column=None, chunk_size=BULK_CHUNK_SIZE, db_path=DB_PATH):
+    """
+    Insert row tuples with executemany, one transaction per chunk (or, when called inside
+    another get_connection block, as part of the caller's transaction, committed by it).
+    Rows whose key already exists are skipped. Returns {"inserted": n, "skipped": m}.
+    """
+    placeholders = ", ".join("?" for _ in columns)
+    column_list = ", ".join(columns)
+    if conflict_column:
+        insert_query = (
+            f"INSERT INTO {table} ({column_list}) VALUES ({placeholders}) "
+            f"ON CONFLICT({conflict_column}) DO NOTHING"
+        )
+    else:
+        insert_query = f"INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})"
+
+    inserted = skipped = 0
+    rows = iter(rows)
+    nested = get_pool(db_path).held() is not None
+    with get_connection(db_path) as conn:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            cursor = conn.executemany(insert_query, chunk)
+            if not nested:
+                conn.commit()  # One commit per chunk keeps the WAL small on huge imports
+
+            # rowcount counts only the rows this statement inserted; total_changes would
+            # also count the rows written by the FTS, rollup and version triggers
+            written = cursor.rowcount
+            inserted += written
+            skipped += len(chunk) - written
+
+    return {"inserted": inserted, "skipped": skipped}
@@ -0,0 +1,33 @@
+"""
+Shared caches for the Streamlit pages.
+
+Table frames live in one FrameSync per table for the whole process
+(shared_frame): the first call loads the table, later calls merge in only what
+changed.
+"""
+import pandas as pd
+import streamlit as st
+from app.data.delta import FrameSync
+
+# Copy-on-write: a session that modifies a frame it was handed gets its own copy,
+# and the shared frame is never changed under the other sessions
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)  # Always on from pandas 3
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_frame_sync(table, columns):
+    """One FrameSync per table (and column list) for the whole server process, shared by every session."""
+    return FrameSync(table, columns)
+
+
+def shared_frame(table, columns=None):
+    """
+    The process-wide FrameSync for a table, optionally holding only some columns (views
+    that need the same columns share one). The first call (from any session) loads the
+    table; later calls merge in only the rows added, edited or deleted since, or do nothing if it
+    is unchanged. Read sync.df; don't store it in st.session_state.
+    Returns (FrameSync, {"added": n, "updated": u, "removed": m, "full_reload": bool}).
+    """
+    sync = _shared_frame_sync(table, tuple(columns) if columns else None)
+    return sync, sync.refresh()
@@ -0,0 +1,207 @@
+"""
+Optional columnar snapshots of the data tables (Arrow IPC or Parquet).
+
+SQLite stays the source of truth. A snapshot is a read-optimised copy that a
+cold start can memory-map instead of parsing text; FrameSync then pulls only
+the rows changed since the snapshot was taken. Choose the backend with the
+DATA_BACKEND environment variable: "sqlite" (default), "arrow" or "parquet".
+
+    python -m app.data.columnar --from-db              # snapshot the database
+    python -m app.data.columnar --from-csv --format parquet
+"""
+import argparse
+import os
+from pathlib import Path
+
+import pandas as pd
+from app.data.csv_store import read_tombstones
+from app.data.db import DATA_DIR, close_all_pools, get_connection
+from app.data.ingest import SOURCES, TABLES
+from app.data.migrations import run_migrations
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow the app simply stays on SQLite
+    pa = None
+
+COLUMNAR_DIR = DATA_DIR / "columnar"
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "sqlite").lower()
+
+# Repository column kinds -> Arrow types; ints are read as float64 for the same
+# reason ingest reads them that way (blanks and "37.0"), then downcast on load
+ARROW_TYPES = {
+    "int": "float64",
+    "float": "float64",
+    "timestamp": "string",
+    "date": "string",
+    "text": "string",
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The arrow and parquet backends need pyarrow (pip install pyarrow)")
+
+
+def snapshot_path(table, fmt):
+    """Where the snapshot of table in format fmt ("arrow" or "parquet") lives."""
+    return COLUMNAR_DIR / f"{table}{FORMATS[fmt]}"
+
+
+def _open_writer(path, schema, fmt):
+    if fmt == "arrow":
+        # Uncompressed on purpose: an uncompressed IPC file can be memory-mapped without copying
+        return pa.ipc.new_file(str(path), schema)
+    return pq.ParquetWriter(str(path), schema)
+
+
+def _write_batches(table, batches, schema, fmt, metadata):
+    """Write record batches to a temp file, then move it over the snapshot in one step."""
+    COLUMNAR_DIR.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(table, fmt)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    schema = schema.with_metadata({key: str(value) for key, value in metadata.items()})
+
+    rows = 0
+    with _open_writer(temp_path, schema, fmt) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            rows += batch.num_rows
+    os.replace(temp_path, path)  # Readers see the old file or the new one, never half of one
+    return rows
+
+
+def convert_csv(table, csv_path, fmt="arrow"):
+    """
+    Stream a CSV (or .csv.gz) into a snapshot of table, block by block, keeping only the
+    table's columns. Returns the number of rows written.
+    """
+    _require_pyarrow()
+    column_types = TABLES[table][0]
+    reader = pa_csv.open_csv(
+        str(csv_path),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: ARROW_TYPES[kind] for column, kind in column_types.items()},
+            include_columns=list(column_types),
+            include_missing_columns=True,
+        ),
+    )
+    batches = reader
+    deleted = pa.array([float(key) for key in read_tombstones(Path(csv_path))], type=pa.float64())
+    if len(deleted):
+        # Rows deleted in the app but not yet compacted out of the CSV
+        key_column = TABLES[table][1]
+        batches = (batch.filter(pc.invert(pc.is_in(batch.column(key_column), value_set=deleted)))
+                   for batch in reader)
+
+    # Positions 0: every delete and edit logged in the database still applies to CSV rows
+    return _write_batches(table, batches, reader.schema, fmt, {"source": "csv", "tombstone_seq": 0, "update_seq": 0})
+
+
+def _arrow_type(declared):
+    """Arrow type for a column's declared SQLite type."""
+    declared = (declared or "").upper()
+    if "INT" in declared or "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pa.float64()
+    return pa.string()
+
+
+def _frame_to_batch(chunk, schema):
+    """One chunk of query results as a record batch of the given schema."""
+    for field in schema:
+        # SQLite columns can hold mixed types; coerce each to what the schema declares
+        if pa.types.is_floating(field.type):
+            chunk[field.name] = pd.to_numeric(chunk[field.name], errors="coerce")
+        else:
+            chunk[field.name] = chunk[field.name].astype("string")
+    return pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def export_table(table, fmt="arrow", chunk_rows=50_000):
+    """
+    Snapshot a database table, chunk by chunk, in a single read transaction. The last
+    tombstone and edit applied are stored with the file so FrameSync resumes exactly from them.
+    Returns the number of rows written.
+    """
+    _require_pyarrow()
+    key_column = TABLES[table][1]
+
+    with get_connection() as conn:
+        conn.execute("BEGIN")  # Rows and log positions from one snapshot
+        columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        schema = pa.schema([(column[1], _arrow_type(column[2])) for column in columns])
+        tombstone_seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM deleted_rows WHERE table_name = ?", (table,)
+        ).fetchone()[0]
+        update_seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM updated_rows WHERE table_name = ?", (table,)
+        ).fetchone()[0]
+
+        chunks = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {key_column}", conn, chunksize=chunk_rows)
+        batches = (_frame_to_batch(chunk, schema) for chunk in chunks)
+        metadata = {"source": "database", "tombstone_seq": tombstone_seq, "update_seq": update_seq}
+        return _write_batches(table, batches, schema, fmt, metadata)
+
+
+def read_snapshot(table, columns=None, fmt=None):
+    """
+    Read a snapshot (memory-mapped), optionally only some columns.
+    Returns (DataFrame, tombstone_seq, update_seq), or None if the backend is SQLite or no snapshot exists.
+    """
+    fmt = fmt or DATA_BACKEND
+    if fmt not in FORMATS:
+        return None
+    _require_pyarrow()
+    path = snapshot_path(table, fmt)
+    if not path.exists():
+        return None
+
+    if fmt == "arrow":
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            data = reader.read_all()  # Zero-copy view of the mapped file
+            if columns:
+                data = data.select(list(columns))
+            df = data.to_pandas()  # Only the selected columns are materialised
+            metadata = reader.schema.metadata or {}
+    else:
+        data = pq.read_table(str(path), columns=list(columns) if columns else None, memory_map=True)
+        df = data.to_pandas()
+        metadata = pq.read_schema(str(path)).metadata or {}
+
+    # Snapshots from before the edit log have no update_seq; 0 re-reads every logged edit
+    return df, int(metadata.get(b"tombstone_seq", 0)), int(metadata.get(b"update_seq", 0))
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.data.columnar (--from-db | --from-csv) [--format FMT]"""
+    parser = argparse.ArgumentParser(description="Write Arrow/Parquet snapshots of the data tables.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-db", action="store_true", help="Snapshot the tables in intelligence.db")
+    source.add_argument("--from-csv", action="store_true", help="Convert the CSV files in DATA/")
+    parser.add_argument("--format", choices=list(FORMATS), default="arrow", help="Snapshot format (default arrow)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.from_db:
+            run_migrations()  # The tombstone and edit logs must exist before the snapshot records positions
+        for table, _, csv_path in SOURCES.values():
+            if args.from_db:
+                rows = export_table(table, args.format)
+            elif csv_path.exists():
+                rows = convert_csv(table, csv_path, args.format)
+            else:
+                print(f"{table}: {csv_path} not found, skipped")
+                continue
+            print(f"{table}: {rows} rows -> {snapshot_path(table, args.format)}")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
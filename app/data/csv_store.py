@@ -0,0 +1,222 @@
+"""
+Append-only CSV persistence with a tombstone sidecar.
+
+The DATA/*.csv files are kept as a plain-text copy of every edit. Adding a
+record appends one line and deleting one appends its ID to "<file>.tombstones";
+neither rewrites the file. Compaction (in a background thread once enough
+tombstones pile up) drops the deleted rows by writing a temp file and moving
+it over the original with os.replace, so a crash leaves either the old file or
+the new one. A lock file serialises writers across processes (fcntl on Linux
+and macOS, msvcrt on Windows).
+"""
+import csv
+import io
+import os
+import threading
+from contextlib import contextmanager
+
+from app.data.db import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+COMPACT_THRESHOLD = 100  # Tombstones that trigger a background compaction
+
+# CSV_MIRROR=0 stops edits being copied to the CSV files
+CSV_MIRROR = os.environ.get("CSV_MIRROR", "1") != "0"
+
+# Table -> (CSV file, key column)
+CSV_FILES = {
+    "cyber_incidents": (DATA_DIR / "cyber_incidents.csv", "incident_id"),
+    "it_tickets": (DATA_DIR / "it_tickets.csv", "ticket_id"),
+    "datasets_metadata": (DATA_DIR / "datasets_metadata.csv", "dataset_id"),
+}
+
+
+def tombstone_path(csv_path):
+    return csv_path.with_name(csv_path.name + ".tombstones")
+
+
+@contextmanager
+def file_lock(csv_path):
+    """Exclusive lock on "<file>.lock", held across processes until the block exits."""
+    lock_path = csv_path.with_name(csv_path.name + ".lock")
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)  # Retries for ~10s
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _append_line(path, line):
+    """Append one complete line and flush it to disk."""
+    with open(path, "a+b") as f:
+        # A crash mid-append can leave a partial last line; start on a fresh one
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = "\n" + line
+        f.write(line.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _read_header(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def _format_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def append_record(csv_path, record):
+    """Append one record (a dict) as a CSV line, in the column order of the file's header."""
+    with file_lock(csv_path):
+        if not csv_path.exists() or csv_path.stat().st_size == 0:
+            header = list(record)
+            _append_line(csv_path, _format_row(header))
+        else:
+            header = _read_header(csv_path)
+        _append_line(csv_path, _format_row(["" if record.get(column) is None else record[column]
+                                            for column in header]))
+
+
+def delete_record(csv_path, key):
+    """Log key as deleted; the row itself is removed by the next compaction."""
+    with file_lock(csv_path):
+        _append_line(tombstone_path(csv_path), f"{key}\n")
+        pending = _count_tombstones(csv_path)
+    if pending >= COMPACT_THRESHOLD:
+        compact_in_background(csv_path)
+
+
+def _count_tombstones(csv_path):
+    path = tombstone_path(csv_path)
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def read_tombstones(csv_path):
+    """Keys deleted from csv_path but not yet compacted away, as strings."""
+    path = tombstone_path(csv_path)
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def compact(csv_path, key_column):
+    """
+    Rewrite the CSV without the tombstoned rows and clear the tombstone log.
+    Returns the number of rows removed.
+    """
+    with file_lock(csv_path):
+        log_path = tombstone_path(csv_path)
+        deleted = read_tombstones(csv_path)
+        if not deleted or not csv_path.exists():
+            return 0
+
+        temp_path = csv_path.with_name(csv_path.name + ".tmp")
+        removed = 0
+        with open(csv_path, newline="", encoding="utf-8") as src, \
+                open(temp_path, "w", newline="", encoding="utf-8") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator="\n")
+            header = next(reader, [])
+            writer.writerow(header)
+            key_index = header.index(key_column)
+            for row in reader:
+                key = row[key_index] if key_index < len(row) else ""
+                if key in deleted or _normalise_key(key) in deleted:
+                    removed += 1
+                    continue
+                writer.writerow(row)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        os.replace(temp_path, csv_path)  # Atomic: readers never see a half-written file
+        os.remove(log_path)  # Re-applying these after a crash here would be harmless
+    return removed
+
+
+def _normalise_key(key):
+    """Turn a key written as a float ("1003.0") into the form delete_record logs ("1003")."""
+    try:
+        return str(int(float(key)))
+    except ValueError:
+        return key
+
+
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+
+def compact_in_background(csv_path):
+    """Start a compaction thread for csv_path unless one is already running in this process."""
+    key_column = next(key for path, key in CSV_FILES.values() if path == csv_path)
+    with _compacting_lock:
+        if csv_path in _compacting:
+            return
+        _compacting.add(csv_path)
+
+    def run():
+        try:
+            compact(csv_path, key_column)
+        finally:
+            with _compacting_lock:
+                _compacting.discard(csv_path)
+
+    threading.Thread(target=run, name=f"compact-{csv_path.name}", daemon=True).start()
+
+
+def mirror_insert(table, record):
+    """Copy a newly inserted row to the table's CSV file (if mirroring is on)."""
+    if not CSV_MIRROR:
+        return
+    try:
+        append_record(CSV_FILES[table][0], record)
+    except OSError as e:
+        print(f"Could not append to {CSV_FILES[table][0]}: {e}")  # The database write still stands
+
+
+def mirror_delete(table, key):
+    """Record a deleted row against the table's CSV file (if mirroring is on)."""
+    if not CSV_MIRROR:
+        return
+    try:
+        delete_record(CSV_FILES[table][0], key)
+    except OSError as e:
+        print(f"Could not log delete in {CSV_FILES[table][0]}: {e}")
+
+
+def compact_all():
+    """Compact every CSV file that has pending tombstones; returns {table: rows removed}."""
+    return {table: compact(path, key) for table, (path, key) in CSV_FILES.items()}
+
+
+if __name__ == "__main__":
+    # python -m app.data.csv_store: fold pending deletes into the CSV files now
+    for table, removed in compact_all().items():
+        print(f"{table}: {removed} deleted rows compacted out")
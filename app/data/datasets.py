@@ -1,108 +1,94 @@
-import sqlite3
 import pandas as pd
-
-def connect_database(db_path="DATA/intelligence.db"):
-    """Connect to the SQLite database."""
-    return sqlite3.connect(db_path)
+from app.data.bulk import BULK_CHUNK_SIZE, bulk_upsert, frame_to_rows
+from app.data.csv_store import mirror_delete, mirror_insert
+from app.data.db import get_connection
+from app.data.migrations import run_migrations
+from app.data.sequences import fill_missing_ids
+
+# Table columns and the type each one is stored as
+DATASET_COLUMNS = {
+    "dataset_id": "int",
+    "name": "text",
+    "rows": "int",
+    "columns": "int",
+    "uploaded_by": "text",
+    "upload_date": "date",
+}
 
 def create_datasets_metadata_table():
-    """Create the datasets_metadata table if it doesn't exist."""
-    conn = connect_database()
-    cursor = conn.cursor()
-
-    # SQL query to create the table
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS datasets_metadata (
-        dataset_id INTEGER PRIMARY KEY,
-        name TEXT,
-        rows INTEGER,
-        columns INTEGER,
-        uploaded_by TEXT,
-        upload_date TEXT
-    )
-    """
-
-    # Execute the query to create the table
-    cursor.execute(create_table_query)
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    """Create the datasets_metadata table if it doesn't exist and apply pending migrations."""
+    run_migrations()
 
 def insert_dataset(dataset_id, name, rows, columns, uploaded_by, upload_date):
     """Insert a new dataset record if it doesn't already exist."""
-    conn = connect_database()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Check if the dataset_id already exists
+        cursor.execute("SELECT COUNT(*) FROM datasets_metadata WHERE dataset_id = ?", (dataset_id,))
+        if cursor.fetchone()[0] > 0:
+            print(f"Dataset ID {dataset_id} already exists, skipping insert.")
+            return None  # Skip inserting the duplicate dataset
+
+        # SQL query to insert dataset metadata
+        insert_query = """
+            INSERT INTO datasets_metadata
+            (dataset_id, name, rows, columns, uploaded_by, upload_date)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
 
-    # Check if the dataset_id already exists
-    cursor.execute("SELECT COUNT(*) FROM datasets_metadata WHERE dataset_id = ?", (dataset_id,))
-    if cursor.fetchone()[0] > 0:
-        print(f"Dataset ID {dataset_id} already exists, skipping insert.")
-        conn.close()
-        return None  # Skip inserting the duplicate dataset
+        cursor.execute(insert_query, (dataset_id, name, rows, columns, uploaded_by, upload_date))
 
-    # SQL query to insert dataset metadata
+    return dataset_id
+
+def add_dataset(name, rows, columns, uploaded_by, upload_date):
+    """Insert one dataset record and return the ID SQLite assigned to it."""
     insert_query = """
         INSERT INTO datasets_metadata
-        (dataset_id, name, rows, columns, uploaded_by, upload_date)
-        VALUES (?, ?, ?, ?, ?, ?)
+        (name, rows, columns, uploaded_by, upload_date)
+        VALUES (?, ?, ?, ?, ?)
     """
+    with get_connection() as conn:
+        cursor = conn.execute(insert_query, (name, rows, columns, uploaded_by, upload_date))
+        dataset_id = cursor.lastrowid  # Allocated by the database, never by the page
+
+    mirror_insert("datasets_metadata", {
+        "dataset_id": dataset_id, "name": name, "rows": rows, "columns": columns,
+        "uploaded_by": uploaded_by, "upload_date": upload_date,
+    })
+    return dataset_id
 
-    cursor.execute(insert_query, (dataset_id, name, rows, columns, uploaded_by, upload_date))
-    conn.commit()
-    conn.close()  # Close the connection
+def delete_dataset(dataset_id):
+    """Delete one dataset record; returns True if a row was removed."""
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM datasets_metadata WHERE dataset_id = ?", (dataset_id,))
+        deleted = cursor.rowcount > 0
 
-    return dataset_id
+    if deleted:
+        mirror_delete("datasets_metadata", dataset_id)
+    return deleted
 
 def get_all_datasets():
     """Return all datasets as a DataFrame."""
-    conn = connect_database()
     query = "SELECT * FROM datasets_metadata"  # Store query in a variable for readability
-    df = pd.read_sql_query(query, conn)  # Read the results into a DataFrame
-    conn.close()
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn)  # Read the results into a DataFrame
     return df
 
-def insert_datasets_from_csv(csv_file_path):
-    """Insert datasets into the database from a CSV file."""
+def insert_datasets_from_frame(df, chunk_size=BULK_CHUNK_SIZE):
+    """Bulk insert dataset records from a DataFrame, skipping IDs that already exist."""
+    df = fill_missing_ids(df, "datasets_metadata")  # Rows without an ID get one from a single reserved block
+    rows = frame_to_rows(df, DATASET_COLUMNS)  # Typed tuples, converted column by column
+    return bulk_upsert("datasets_metadata", list(DATASET_COLUMNS), rows,
+                       conflict_column="dataset_id", chunk_size=chunk_size)
+
+def insert_datasets_from_csv(csv_file_path, chunk_size=BULK_CHUNK_SIZE):
+    """Insert datasets into the database from a CSV file; returns inserted/skipped counts."""
     # Read the CSV file into a DataFrame
     df = pd.read_csv(csv_file_path)
 
     # Check if DataFrame is empty
     if df.empty:
-        print("CSV file is empty!")
-        return
-
-    # Print the contents of the DataFrame to verify
-    print("Data from CSV:", df.head())  # Display first few rows of the DataFrame
-
-    # Insert each row of the DataFrame into the SQLite table
-    for _, row in df.iterrows():
-        dataset_id = row.get('dataset_id')
-        name = row.get('name')
-        rows = row.get('rows')
-        columns = row.get('columns')
-        uploaded_by = row.get('uploaded_by')
-        upload_date = row.get('upload_date')
-
-        print(f"Inserting dataset: {dataset_id}, {name}")  # Debugging output
-
-        insert_dataset(
-            dataset_id=dataset_id,
-            name=name,
-            rows=rows,
-            columns=columns,
-            uploaded_by=uploaded_by,
-            upload_date=upload_date
-        )
-
-    print("All datasets inserted successfully!")
-
-
-# Create the table if it doesn't exist
-create_datasets_metadata_table()
-
-# Example usage: Insert datasets from a CSV file into the database
-csv_file_path = r'C:\Users\ali08\PycharmProjects\CourseworkAttempt\DATA\datasets_metadata.csv'
-insert_datasets_from_csv(csv_file_path)
+        return {"inserted": 0, "skipped": 0}
 
-# Fetch all datasets from the database
-datasets_df = get_all_datasets()
-print("Datasets from DB:", datasets_df)
\ No newline at end of file
+    return insert_datasets_from_frame(df, chunk_size=chunk_size)
@@ -1,15 +1,136 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from queue import Empty, Full, LifoQueue
 
-DATA_DIR = Path("DATA")
+# Resolve DATA/ from the project root so it works no matter where Streamlit is launched
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "DATA"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-DB_PATH = DATA_DIR / "DATA/intelligence.db" # Path
+DB_PATH = DATA_DIR / "intelligence.db"  # Path
+
+POOL_SIZE = 8  # Idle connections kept open per database file
+
+# Pragmas applied once to every new connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",     # Readers don't block the writer
+    "PRAGMA synchronous=NORMAL",   # Safe with WAL and much faster than FULL
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",    # ~20 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA busy_timeout=5000",    # Wait for locks instead of failing straight away
+)
+
 
 def connect_database(db_path=DB_PATH):
     """
     Connects to a SQLite database,
     Creates the DB file if it doesn't exist
     """
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=5.0)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections for a single database file."""
+
+    def __init__(self, db_path=DB_PATH, size=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self._idle = LifoQueue(maxsize=size)  # LIFO keeps the warmest connection in use
+        self._local = threading.local()       # Connection currently held by this thread
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            return connect_database(self.db_path)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()  # Pool is full, drop the extra connection
+
+    def held(self):
+        """Return the connection this thread is currently using, if any."""
+        return getattr(self._local, "conn", None)
+
+    @contextmanager
+    def connection(self):
+        """Yield this thread's connection, checking one out of the pool if needed."""
+        held = self.held()
+        if held is not None:
+            # Nested call on the same thread: reuse the connection already held
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()  # Never hand a half-finished transaction to the next caller
+            self._release(conn)
+
+    def close_all(self):
+        """Close every idle connection in the pool."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH):
+    """Return the shared pool for a database file, creating it on first use."""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def get_connection(db_path=DB_PATH):
+    """Borrow a pooled connection; commits on success and rolls back on error."""
+    pool = get_pool(db_path)
+    outermost = pool.held() is None  # Nested calls leave the commit to the outer one
+    with pool.connection() as conn:
+        try:
+            yield conn
+        except Exception:
+            if outermost and conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            if outermost and conn.in_transaction:
+                conn.commit()
+
+
+def add_missing_columns(conn, table, columns):
+    """Add any column from columns (name -> SQL type) that an older copy of table lacks."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, sql_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+
 
-    return sqlite3.connect(str(db_path))
\ No newline at end of file
+def close_all_pools():
+    """Close every pooled connection (used by CLI scripts on exit)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
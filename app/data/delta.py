@@ -0,0 +1,185 @@
+"""
+Incremental refresh of in-memory table frames.
+
+A FrameSync remembers the highest ID it has seen (the high-water mark) and the
+last tombstone and edit it applied. A refresh fetches only rows above the
+mark, rows edited since and IDs deleted since, so its cost depends on how much
+changed, not on table size. read_changes is the same delta read for other
+copies of a table (the similarity index uses it too).
+
+A sync never modifies its frame in place: each refresh builds a new DataFrame
+and swaps it in, so frames already handed out stay valid snapshots.
+"""
+import threading
+
+import pandas as pd
+from app.data.db import get_connection
+from app.data.columnar import read_snapshot
+from app.data.migrations import TABLE_KEYS
+from app.data.schema import apply_schema, concat_frames
+from app.data.versions import table_version
+
+
+def read_changes(table, high_water, tombstone_seq, update_seq, columns=None):
+    """
+    Everything that changed in table since a sync, read from one snapshot:
+    {"rows": DataFrame of the rows above high_water or edited since update_seq (key order),
+     "deleted": IDs deleted since tombstone_seq, "edited": IDs edited since update_seq,
+     "tombstone_seq", "update_seq": the new positions, "total_rows", "version"}.
+    A copy applies it by dropping deleted and edited IDs, then adding rows.
+    """
+    key_column = TABLE_KEYS[table]
+    select = ", ".join(columns) if columns else "*"
+    with get_connection() as conn:
+        conn.execute("BEGIN")  # New rows, edits, tombstones and counts from one snapshot
+        rows = pd.read_sql_query(
+            # IN over a UNION rather than OR, so both halves use an index instead of scanning the table
+            f"SELECT {select} FROM {table} WHERE {key_column} IN ("
+            f"SELECT {key_column} FROM {table} WHERE {key_column} > ? "
+            f"UNION SELECT row_id FROM updated_rows WHERE table_name = ? AND seq > ?) ORDER BY {key_column}",
+            conn, params=(high_water, table, update_seq)
+        )
+        tombstones = conn.execute(
+            "SELECT seq, row_id FROM deleted_rows WHERE table_name = ? AND seq > ? ORDER BY seq",
+            (table, tombstone_seq)
+        ).fetchall()
+        edits = conn.execute(
+            "SELECT seq, row_id FROM updated_rows WHERE table_name = ? AND seq > ? ORDER BY seq",
+            (table, update_seq)
+        ).fetchall()
+        total_rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        version = conn.execute(
+            "SELECT version FROM table_versions WHERE table_name = ?", (table,)
+        ).fetchone()[0]
+
+    return {
+        "rows": rows,
+        "deleted": {row_id for _, row_id in tombstones},
+        "edited": {row_id for _, row_id in edits},
+        "tombstone_seq": tombstones[-1][0] if tombstones else tombstone_seq,
+        "update_seq": edits[-1][0] if edits else update_seq,
+        "total_rows": total_rows,
+        "version": version,
+    }
+
+
+def log_positions(conn, table):
+    """(tombstone_seq, update_seq): the latest delete and edit logged for table."""
+    return tuple(
+        conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {log} WHERE table_name = ?", (table,)).fetchone()[0]
+        for log in ("deleted_rows", "updated_rows")
+    )
+
+
+class FrameSync:
+    """
+    A compactly typed DataFrame copy of one table, kept current by pulling deltas.
+    columns limits the copy to the columns a view needs (the key is always kept); a
+    columnar snapshot then only converts those.
+    """
+
+    def __init__(self, table, columns=None):
+        self.table = table
+        self.key_column = TABLE_KEYS[table]
+        self.columns = None
+        if columns:
+            self.columns = [self.key_column] + [column for column in columns if column != self.key_column]
+        self.df = None
+        self.version = None       # Table change counter at the last sync
+        self.high_water = 0       # Highest key present when last synced
+        self.tombstone_seq = 0    # Last deleted_rows entry applied
+        self.update_seq = 0       # Last updated_rows entry applied
+        self._lock = threading.RLock()  # Shared between sessions; one refresh at a time
+
+    def load(self):
+        """
+        Full load of the table (from the columnar snapshot if DATA_BACKEND selects one);
+        also resets the high-water mark and log positions.
+        """
+        with self._lock:
+            return self._load()
+
+    def _load(self):
+        if self._load_snapshot():
+            return {"added": len(self.df), "updated": 0, "removed": 0, "full_reload": True}
+        return self._load_database()
+
+    def _load_snapshot(self):
+        """
+        Start from the Arrow/Parquet snapshot when that backend is selected, then pull the
+        changes made since it was written. Returns False if there is no usable snapshot.
+        """
+        snapshot = read_snapshot(self.table, self.columns)
+        if snapshot is None:
+            return False
+        df, tombstone_seq, update_seq = snapshot
+
+        with get_connection() as conn:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+        if list(df.columns) != (self.columns or columns) or not set(df.columns) <= set(columns):
+            return False  # Written before a schema change (or from a CSV with other columns)
+
+        self.df = apply_schema(df, self.table)
+        self.high_water = int(df[self.key_column].max()) if not df.empty else 0
+        self.tombstone_seq = tombstone_seq
+        self.update_seq = update_seq
+        self.version = None  # Forces the delta pull below
+        self._refresh()
+        return True
+
+    def _load_database(self):
+        with get_connection() as conn:
+            conn.execute("BEGIN")  # One snapshot for the rows and the marks
+            select = ", ".join(self.columns) if self.columns else "*"
+            df = pd.read_sql_query(f"SELECT {select} FROM {self.table} ORDER BY {self.key_column}", conn)
+            self.tombstone_seq, self.update_seq = log_positions(conn, self.table)
+            self.version = conn.execute(
+                "SELECT version FROM table_versions WHERE table_name = ?", (self.table,)
+            ).fetchone()[0]
+
+        self.df = apply_schema(df, self.table)
+        self.high_water = int(df[self.key_column].max()) if not df.empty else 0
+        return {"added": len(df), "updated": 0, "removed": 0, "full_reload": True}
+
+    def refresh(self):
+        """
+        Merge rows added above the high-water mark, re-read edited rows and drop tombstoned IDs.
+        Returns {"added": n, "updated": u, "removed": m, "full_reload": bool}.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if self.df is None:
+            return self._load()
+        if table_version(self.table) == self.version:
+            return {"added": 0, "updated": 0, "removed": 0, "full_reload": False}  # Nothing changed
+
+        changes = read_changes(self.table, self.high_water, self.tombstone_seq, self.update_seq, self.columns)
+        new_rows = changes["rows"]
+
+        df = self.df
+        removed = updated = 0
+        if changes["deleted"] or changes["edited"]:
+            present = df[self.key_column]
+            removed = int(present.isin(changes["deleted"]).sum())
+            updated = int(present.isin(changes["edited"] - changes["deleted"]).sum())
+            df = df[~present.isin(changes["deleted"] | changes["edited"])]
+
+        added = 0
+        if not new_rows.empty:
+            added = int((new_rows[self.key_column] > self.high_water).sum())
+            self.high_water = max(self.high_water, int(new_rows[self.key_column].max()))
+            df = concat_frames(df, new_rows, self.table)
+            if updated:
+                df = df.sort_values(self.key_column, kind="stable")  # Edited rows go back in key order
+
+        # Rows imported with IDs below the mark aren't visible as a delta
+        if len(df) != changes["total_rows"]:
+            return self._load_database()
+
+        self.df = df.reset_index(drop=True) if removed or updated else df
+        self.tombstone_seq = changes["tombstone_seq"]
+        self.update_seq = changes["update_seq"]
+        self.version = changes["version"]
+        return {"added": added, "updated": updated, "removed": removed, "full_reload": False}
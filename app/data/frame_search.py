@@ -0,0 +1,97 @@
+"""
+Vectorised substring search over DataFrames, used when the full-text index
+is not available. Each frame's searchable text is built once; every query is
+then a single substring pass over one pre-lowered column.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+QUERY_CACHE_SIZE = 64  # Query results remembered per index
+
+# Joins the columns of a row; a query can't match across two columns, same as the row-wise scan
+_SEPARATOR = "\x1f"
+
+
+class FrameSearchIndex:
+    """
+    One lower-cased, concatenated search column for a DataFrame, plus memoised query results.
+    It keeps no reference to the frame itself, so the frame (and with it this index) can be
+    freed as soon as a refresh swaps in a new one.
+    """
+
+    def __init__(self, df, columns=None, cache_size=QUERY_CACHE_SIZE):
+        self.rows = len(df)
+        self.columns = list(columns) if columns else list(df.columns)
+        self._cache_size = cache_size
+        self._results = OrderedDict()  # query -> boolean mask (LRU)
+        self._lock = threading.Lock()
+
+        # Built once per load; missing cells contribute no text (not the literal "nan")
+        haystack = None
+        for column in self.columns:
+            values = df[column]
+            text = values.astype(str).where(values.notna(), "").str.lower()
+            haystack = text if haystack is None else haystack + _SEPARATOR + text
+
+        # Plain Python strings: a substring test per row beats str.contains on either string backend
+        self._haystack = None if haystack is None else haystack.to_numpy(dtype=object)
+
+    def mask(self, query):
+        """Boolean array marking the rows that contain query (case-insensitive)."""
+        key = query.lower()
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        if self._haystack is None:
+            result = np.zeros(self.rows, dtype=bool)
+        else:
+            # Literal match (no regex), like str.contains(key, regex=False)
+            result = np.fromiter((key in text for text in self._haystack), dtype=bool, count=len(self._haystack))
+
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self._cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def search(self, df, query):
+        """Rows of df (the frame this index was built from) that contain query in any indexed column."""
+        if not query:
+            return df
+        return df[self.mask(query)]
+
+
+# id(df) -> (weakref to df, {columns: index}); entries vanish when the frame is garbage collected,
+# which works because nothing in here holds the frame strongly
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(df, columns=None):
+    """Return the search index for this exact DataFrame, building it on first use."""
+    column_key = tuple(columns) if columns else None
+    frame_id = id(df)
+
+    with _indexes_lock:
+        entry = _indexes.get(frame_id)
+        if entry is None or entry[0]() is not df:
+            entry = (weakref.ref(df), {})
+            _indexes[frame_id] = entry
+            weakref.finalize(df, _indexes.pop, frame_id, None)
+        index = entry[1].get(column_key)
+
+    if index is None:
+        index = FrameSearchIndex(df, columns)
+        with _indexes_lock:
+            entry[1][column_key] = index
+    return index
+
+
+def search_frame(df, query, columns=None):
+    """Case-insensitive substring search of df (optionally only some columns), memoised per query."""
+    return get_search_index(df, columns).search(df, query)
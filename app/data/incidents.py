@@ -1,117 +1,131 @@
 import pandas as pd
-import sqlite3
-from app.data.db import connect_database
-
-
-def connect_database(db_path="DATA/intelligence.db"):
-    """Connect to the SQLite database."""
-    return sqlite3.connect(db_path)
+from app.data.bulk import BULK_CHUNK_SIZE, bulk_upsert, frame_to_rows
+from app.data.csv_store import mirror_delete, mirror_insert
+from app.data.db import get_connection
+from app.data.migrations import run_migrations
+from app.data.queries import PAGE_SIZE, count_rows, fetch_page
+from app.data.sequences import fill_missing_ids
+
+# Table columns and the type each one is stored as
+INCIDENT_COLUMNS = {
+    "incident_id": "int",
+    "timestamp": "timestamp",
+    "severity": "text",
+    "category": "text",
+    "status": "text",
+    "description": "text",
+    "incident_type": "text",
+}
 
 
 def create_incidents_table():
-    """Create the cyber_incidents table if it doesn't exist."""
-    conn = connect_database()
-    cursor = conn.cursor()
-
-    # SQL query to create the table
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS cyber_incidents (
-        incident_id INTEGER PRIMARY KEY,
-        timestamp TEXT,
-        severity TEXT,
-        category TEXT,
-        status TEXT,
-        description TEXT,
-        incident_type TEXT
-    )
-    """
-
-    # Execute the query to create the table
-    cursor.execute(create_table_query)
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    """Create the cyber_incidents table if it doesn't exist and apply pending migrations."""
+    run_migrations()
 
 
 def insert_incident(incident_id, timestamp, severity, category, status, description, incident_type):
     """Insert a new incident if it doesn't already exist."""
-    conn = connect_database()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Check if the incident_id already exists
+        cursor.execute("SELECT COUNT(*) FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
+        if cursor.fetchone()[0] > 0:
+            print(f"Incident ID {incident_id} already exists, skipping insert.")
+            return None  # Skip inserting the duplicate incident
+
+        # SQL query to insert incident data
+        insert_query = """
+            INSERT INTO cyber_incidents
+            (incident_id, timestamp, severity, category, status, description, incident_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
 
-    # Check if the incident_id already exists
-    cursor.execute("SELECT COUNT(*) FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-    if cursor.fetchone()[0] > 0:
-        print(f"Incident ID {incident_id} already exists, skipping insert.")
-        conn.close()
-        return None  # Skip inserting the duplicate incident
+        cursor.execute(insert_query, (incident_id, timestamp, severity, category, status, description, incident_type))
 
-    # SQL query to insert incident data
+    return incident_id
+
+
+def add_incident(timestamp, severity, category, status, description, incident_type):
+    """Insert one incident and return the ID SQLite assigned to it."""
     insert_query = """
-        INSERT INTO cyber_incidents 
-        (incident_id, timestamp, severity, category, status, description, incident_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO cyber_incidents
+        (timestamp, severity, category, status, description, incident_type)
+        VALUES (?, ?, ?, ?, ?, ?)
     """
+    with get_connection() as conn:
+        cursor = conn.execute(insert_query, (timestamp, severity, category, status, description, incident_type))
+        incident_id = cursor.lastrowid  # Allocated by the database, never by the page
+
+    mirror_insert("cyber_incidents", {
+        "incident_id": incident_id, "timestamp": timestamp, "severity": severity, "category": category,
+        "status": status, "description": description, "incident_type": incident_type,
+    })
+    return incident_id
 
-    cursor.execute(insert_query, (incident_id, timestamp, severity, category, status, description, incident_type))
-    conn.commit()
-    conn.close()  # Close the connection
 
-    return incident_id
+def delete_incident(incident_id):
+    """Delete one incident; returns True if a row was removed."""
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
+        deleted = cursor.rowcount > 0
+
+    if deleted:
+        mirror_delete("cyber_incidents", incident_id)
+    return deleted
 
 
 def get_all_incidents():
     """Return all incidents as a DataFrame."""
-    conn = connect_database()
     query = "SELECT * FROM cyber_incidents ORDER BY incident_id DESC"  # Store the query for readability
-    df = pd.read_sql_query(query, conn)  # Execute the query and load results into a DataFrame
-    conn.close()  # Close the connection
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn)  # Execute the query and load results into a DataFrame
     return df
 
 
-def insert_incidents_from_csv(csv_file_path):
-    """Insert incidents into the database from a CSV file."""
+# Columns the incidents table can be sorted by
+INCIDENT_SORT_COLUMNS = ("incident_id", "timestamp", "severity", "category", "status")
+
+
+def query_incidents(severity=None, status=None, category=None, start=None, end=None,
+                    sort_by="incident_id", descending=True, after=None, limit=PAGE_SIZE):
+    """
+    Return one page of incidents as (DataFrame, next_cursor).
+    severity/status/category take a value or a list; start/end bound the timestamp.
+    Pass next_cursor back as after= to fetch the next page.
+    """
+    return fetch_page(
+        "cyber_incidents", "incident_id", INCIDENT_SORT_COLUMNS,
+        filters={"severity": severity, "status": status, "category": category},
+        date_column="timestamp", start=start, end=end,
+        sort_by=sort_by, descending=descending, after=after, limit=limit
+    )
+
+
+def count_incidents(severity=None, status=None, category=None, start=None, end=None):
+    """Count the incidents matching the same filters as query_incidents."""
+    return count_rows(
+        "cyber_incidents",
+        filters={"severity": severity, "status": status, "category": category},
+        date_column="timestamp", start=start, end=end
+    )
+
+
+def insert_incidents_from_frame(df, chunk_size=BULK_CHUNK_SIZE):
+    """Bulk insert incidents from a DataFrame, skipping IDs that already exist."""
+    df = fill_missing_ids(df, "cyber_incidents")  # Rows without an ID get one from a single reserved block
+    rows = frame_to_rows(df, INCIDENT_COLUMNS)  # Typed tuples, converted column by column
+    return bulk_upsert("cyber_incidents", list(INCIDENT_COLUMNS), rows,
+                       conflict_column="incident_id", chunk_size=chunk_size)
+
+
+def insert_incidents_from_csv(csv_file_path, chunk_size=BULK_CHUNK_SIZE):
+    """Insert incidents into the database from a CSV file; returns inserted/skipped counts."""
     # Read the CSV file into a DataFrame
     df = pd.read_csv(csv_file_path)
 
     # Check if DataFrame is empty
     if df.empty:
-        print("CSV file is empty!")
-        return
-
-    # Print the contents of the DataFrame to verify
-    print("Data from CSV:", df.head())  # Display first few rows of the DataFrame
-
-    # Insert each row of the DataFrame into the SQLite table
-    for _, row in df.iterrows():
-        incident_id = row.get('incident_id')
-        timestamp = row.get('timestamp')
-        severity = row.get('severity')
-        category = row.get('category')
-        status = row.get('status')
-        description = row.get('description')
-        incident_type = row.get('incident_type')
-
-        print(f"Inserting incident: {incident_id}, {description}")  # Debugging output
-
-        insert_incident(
-            incident_id=incident_id,
-            timestamp=timestamp,
-            severity=severity,
-            category=category,
-            status=status,
-            description=description,
-            incident_type=incident_type
-        )
-
-    print("All incidents inserted successfully!")
-
-
-# Create the table if it doesn't exist
-create_incidents_table()
-
-# Example usage: Insert incidents from a CSV file into the database
-csv_file_path = r'C:\Users\ali08\PycharmProjects\CourseworkAttempt\DATA\cyber_incidents.csv'
-insert_incidents_from_csv(csv_file_path)
-
-# Fetch all incidents from the database
-incidents_df = get_all_incidents()
-print("Incidents from DB:", incidents_df)
\ No newline at end of file
+        return {"inserted": 0, "skipped": 0}
+
+    return insert_incidents_from_frame(df, chunk_size=chunk_size)
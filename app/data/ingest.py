@@ -0,0 +1,191 @@
+"""
+Explicit ingestion entry point. Importing app.data modules never touches the
+database; run this when CSV data should actually be loaded:
+
+    python -m app.data.ingest --incidents DATA/cyber_incidents.csv --tickets DATA/it_tickets.csv.gz
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from app.data.bulk import bulk_upsert, frame_to_rows
+from app.data.csv_store import read_tombstones
+from app.data.datasets import DATASET_COLUMNS, create_datasets_metadata_table
+from app.data.db import DATA_DIR, close_all_pools, get_connection
+from app.data.incidents import INCIDENT_COLUMNS, create_incidents_table
+from app.data.tickets import TICKET_COLUMNS, create_it_tickets_table
+
+STREAM_CHUNK_ROWS = 50_000  # Rows parsed and written per chunk; bounds peak memory
+
+# Table name -> (column types, primary key) for every importable source
+TABLES = {
+    "cyber_incidents": (INCIDENT_COLUMNS, "incident_id"),
+    "it_tickets": (TICKET_COLUMNS, "ticket_id"),
+    "datasets_metadata": (DATASET_COLUMNS, "dataset_id"),
+}
+
+# CLI flag -> (table, table creator, default CSV used when no paths are given)
+SOURCES = {
+    "incidents": ("cyber_incidents", create_incidents_table, DATA_DIR / "cyber_incidents.csv"),
+    "tickets": ("it_tickets", create_it_tickets_table, DATA_DIR / "it_tickets.csv"),
+    "datasets": ("datasets_metadata", create_datasets_metadata_table, DATA_DIR / "datasets_metadata.csv"),
+}
+
+# Explicit CSV dtypes so pandas never has to guess (or upcast) column types per chunk
+READ_DTYPES = {
+    "int": "float64",  # Tolerates blanks and "37.0"; cast to int when the rows are built
+    "float": "float64",
+    "timestamp": "string",
+    "date": "string",
+    "text": "string",
+}
+
+
+def create_checkpoint_table():
+    """Create the ingest_checkpoints table if it doesn't exist."""
+    create_table_query = """
+    CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+        source TEXT PRIMARY KEY,
+        rows_done INTEGER NOT NULL,
+        updated_at TEXT
+    )
+    """
+    with get_connection() as conn:
+        conn.execute(create_table_query)
+
+
+def _checkpoint_key(table, csv_path):
+    return f"{table}:{Path(csv_path).resolve()}"
+
+
+def get_checkpoint(table, csv_path):
+    """Return how many data rows of csv_path were already imported into table."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT rows_done FROM ingest_checkpoints WHERE source = ?",
+            (_checkpoint_key(table, csv_path),)
+        ).fetchone()
+    return row[0] if row else 0
+
+
+def save_checkpoint(table, csv_path, rows_done):
+    """Record the row offset reached so a crashed import can resume from it."""
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO ingest_checkpoints (source, rows_done, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET rows_done = excluded.rows_done, updated_at = excluded.updated_at
+            """,
+            (_checkpoint_key(table, csv_path), rows_done, datetime.now().isoformat(timespec="seconds"))
+        )
+
+
+def clear_checkpoint(table, csv_path):
+    """Forget the checkpoint once a file has been imported completely."""
+    with get_connection() as conn:
+        conn.execute("DELETE FROM ingest_checkpoints WHERE source = ?", (_checkpoint_key(table, csv_path),))
+
+
+def stream_csv_into_table(csv_path, table, chunk_rows=STREAM_CHUNK_ROWS, resume=True, compression="infer"):
+    """
+    Import a CSV (optionally .gz / .zip / .bz2) into table one chunk at a time.
+    Only one chunk is held in memory. Each chunk's rows and the row offset reached are
+    committed in one transaction, so a rerun with resume=True continues right after the
+    last chunk that was written and never replays one (which would duplicate rows
+    without an ID, as they get a fresh key each time).
+    Returns {"inserted": n, "skipped": m, "resumed_from": offset}.
+    """
+    column_types, key_column = TABLES[table]
+    create_checkpoint_table()
+
+    offset = get_checkpoint(table, csv_path) if resume else 0
+    start_offset = offset
+    totals = {"inserted": 0, "skipped": 0}
+
+    # Rows deleted in the app but not yet compacted out of the file must not come back
+    deleted = {float(key) for key in read_tombstones(Path(csv_path))}
+
+    reader = pd.read_csv(
+        csv_path,
+        chunksize=chunk_rows,
+        usecols=lambda column: column in column_types,  # Never materialise unused columns
+        dtype={column: READ_DTYPES[kind] for column, kind in column_types.items()},
+        compression=compression,
+        # Skip already-imported rows without building a huge skip list (line 0 is the header)
+        skiprows=(lambda line: 0 < line <= start_offset) if start_offset else None,
+    )
+
+    for chunk in reader:
+        rows_read = len(chunk)  # The checkpoint counts file rows, including skipped tombstones
+        if deleted:
+            chunk = chunk[~chunk[key_column].isin(deleted)]
+
+        offset += rows_read
+        with get_connection():  # The rows and the checkpoint commit together, or neither does
+            # Timestamps are normalised here, chunk by chunk, by frame_to_rows
+            counts = bulk_upsert(table, list(column_types), frame_to_rows(chunk, column_types),
+                                 conflict_column=key_column, chunk_size=chunk_rows)
+            save_checkpoint(table, csv_path, offset)
+        totals["inserted"] += counts["inserted"]
+        totals["skipped"] += counts["skipped"]
+
+    clear_checkpoint(table, csv_path)
+    totals["resumed_from"] = start_offset
+    return totals
+
+
+def stream_incidents_csv(csv_path, chunk_rows=STREAM_CHUNK_ROWS, resume=True):
+    """Stream cyber_incidents.csv (or .csv.gz) into the cyber_incidents table."""
+    return stream_csv_into_table(csv_path, "cyber_incidents", chunk_rows=chunk_rows, resume=resume)
+
+
+def stream_tickets_csv(csv_path, chunk_rows=STREAM_CHUNK_ROWS, resume=True):
+    """Stream it_tickets.csv (or .csv.gz) into the it_tickets table."""
+    return stream_csv_into_table(csv_path, "it_tickets", chunk_rows=chunk_rows, resume=resume)
+
+
+def stream_datasets_csv(csv_path, chunk_rows=STREAM_CHUNK_ROWS, resume=True):
+    """Stream datasets_metadata.csv (or .csv.gz) into the datasets_metadata table."""
+    return stream_csv_into_table(csv_path, "datasets_metadata", chunk_rows=chunk_rows, resume=resume)
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.data.ingest [--incidents PATH] [--tickets PATH] [--datasets PATH]"""
+    parser = argparse.ArgumentParser(description="Load CSV exports into intelligence.db.")
+    for flag, (table, _, _) in SOURCES.items():
+        parser.add_argument(f"--{flag}", metavar="PATH", help=f"CSV (or .csv.gz) to load into {table}")
+    parser.add_argument("--all-defaults", action="store_true",
+                        help="Load every CSV from the DATA/ folder")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS,
+                        help=f"Rows per chunk (default {STREAM_CHUNK_ROWS})")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore any checkpoint and start from the first row")
+    args = parser.parse_args(argv)
+
+    # Work out which files to load
+    jobs = []
+    for flag, (table, create_table, default_path) in SOURCES.items():
+        path = getattr(args, flag) or (default_path if args.all_defaults else None)
+        if path:
+            jobs.append((table, create_table, Path(path)))
+
+    if not jobs:
+        parser.error("give at least one of --incidents/--tickets/--datasets, or --all-defaults")
+
+    try:
+        for table, create_table, path in jobs:
+            if not path.exists():
+                print(f"{table}: {path} not found, skipped")
+                continue
+
+            create_table()
+            counts = stream_csv_into_table(path, table, chunk_rows=args.chunk_rows, resume=not args.no_resume)
+            resumed = f" (resumed at row {counts['resumed_from']})" if counts["resumed_from"] else ""
+            print(f"{table}: {counts['inserted']} inserted, {counts['skipped']} skipped{resumed}")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
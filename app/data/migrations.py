@@ -0,0 +1,483 @@
+"""
+Versioned schema migrations for intelligence.db.
+
+Each migration runs once, in its own transaction, and is recorded in the
+schema_migrations table. Upgrade an existing database in place with:
+
+    python -m app.data.migrations [--db PATH]
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+
+from app.data.db import BASE_DIR, DATA_DIR, DB_PATH, add_missing_columns, close_all_pools, get_connection
+
+# Current table layouts; new databases are created straight from these
+INCIDENTS_DDL = """
+CREATE TABLE IF NOT EXISTS cyber_incidents (
+    incident_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    severity TEXT,
+    category TEXT,
+    status TEXT,
+    description TEXT,
+    incident_type TEXT
+)
+"""
+
+TICKETS_DDL = """
+CREATE TABLE IF NOT EXISTS it_tickets (
+    ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    priority TEXT,
+    status TEXT,
+    category TEXT,
+    subject TEXT,
+    description TEXT,
+    assigned_to TEXT,
+    created_at TEXT,
+    resolution_time_hours INTEGER
+)
+"""
+
+DATASETS_DDL = """
+CREATE TABLE IF NOT EXISTS datasets_metadata (
+    dataset_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    rows INTEGER,
+    columns INTEGER,
+    uploaded_by TEXT,
+    upload_date TEXT
+)
+"""
+
+TABLE_DDL = {
+    "cyber_incidents": INCIDENTS_DDL,
+    "it_tickets": TICKETS_DDL,
+    "datasets_metadata": DATASETS_DDL,
+}
+
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_base_tables(conn):
+    for ddl in TABLE_DDL.values():
+        conn.execute(ddl)
+
+    # Databases created before the pages wrote tickets lack these columns
+    add_missing_columns(conn, "it_tickets", {
+        "category": "TEXT",
+        "subject": "TEXT",
+        "description": "TEXT",
+        "assigned_to": "TEXT",
+        "created_at": "TEXT",
+        "resolution_time_hours": "INTEGER",
+    })
+
+
+def _use_autoincrement(conn):
+    """Rebuild tables created with a plain INTEGER PRIMARY KEY so deleted IDs are never reused."""
+    for table, ddl in TABLE_DDL.items():
+        create_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        if "AUTOINCREMENT" in create_sql.upper():
+            continue
+
+        old_columns = _table_columns(conn, table)
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        conn.execute(ddl)
+
+        # Keep any legacy columns rather than dropping their data
+        new_columns = _table_columns(conn, table)
+        add_missing_columns(conn, table, {c: "TEXT" for c in old_columns if c not in new_columns})
+
+        column_list = ", ".join(old_columns)
+        conn.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}_old")
+        conn.execute(f"DROP TABLE {table}_old")
+
+    # Legacy ticket tables stored the creation time as created_date
+    if "created_date" in _table_columns(conn, "it_tickets"):
+        conn.execute("UPDATE it_tickets SET created_at = created_date WHERE created_at IS NULL")
+
+
+def _add_filter_indexes(conn):
+    """Composite indexes matching the page filters and sort orders."""
+    index_queries = [
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_status ON cyber_incidents (severity, status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_category_timestamp ON cyber_incidents (category, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status_timestamp ON cyber_incidents (status, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON cyber_incidents (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assigned_status ON it_tickets (assigned_to, status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority_status ON it_tickets (priority, status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON it_tickets (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON it_tickets (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_uploaded_by ON datasets_metadata (uploaded_by)",
+        "CREATE INDEX IF NOT EXISTS idx_datasets_upload_date ON datasets_metadata (upload_date)",
+    ]
+    for query in index_queries:
+        conn.execute(query)
+
+
+def _normalise_timestamps(conn):
+    """Rewrite timestamps as 'YYYY-MM-DD HH:MM:SS' so text order is time order."""
+    timestamp_columns = [
+        ("cyber_incidents", "timestamp", "%Y-%m-%d %H:%M:%S"),
+        ("it_tickets", "created_at", "%Y-%m-%d %H:%M:%S"),
+        ("datasets_metadata", "upload_date", "%Y-%m-%d"),
+    ]
+    for table, column, fmt in timestamp_columns:
+        # Values SQLite can't parse are left untouched rather than nulled
+        conn.execute(
+            f"UPDATE {table} SET {column} = strftime('{fmt}', {column}) "
+            f"WHERE strftime('{fmt}', {column}) IS NOT NULL AND {column} != strftime('{fmt}', {column})"
+        )
+    conn.execute("ANALYZE")  # Give the planner statistics for the new indexes
+
+
+# Full-text indexes: table -> (FTS table, key column, indexed text columns)
+FTS_TABLES = {
+    "cyber_incidents": ("cyber_incidents_fts", "incident_id",
+                        ["timestamp", "severity", "category", "status", "description", "incident_type"]),
+    "it_tickets": ("it_tickets_fts", "ticket_id",
+                   ["priority", "status", "category", "subject", "description", "assigned_to"]),
+    "datasets_metadata": ("datasets_metadata_fts", "dataset_id",
+                          ["name", "uploaded_by", "upload_date"]),
+}
+
+
+def _add_full_text_search(conn):
+    """External-content FTS5 tables mirroring the data tables, kept in sync by triggers."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        return  # SQLite built without FTS5: search falls back to scanning in memory
+
+    for table, (fts_table, key_column, columns) in FTS_TABLES.items():
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"{column_list}, content='{table}', content_rowid='{key_column}', prefix='2 3')"
+        )
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{key_column}, {new_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.{key_column}, {old_values});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', old.{key_column}, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{key_column}, {new_values});
+            END
+        """)
+
+        # Index the rows that already exist
+        conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+# Rollup tables: rollup -> (source table, {rollup column: SQL expression over the source row})
+# NULL dimension values are stored as '' so they take part in the primary key.
+ROLLUPS = {
+    "incident_rollup": ("cyber_incidents", {
+        "day": "substr({row}.timestamp, 1, 10)",
+        "severity": "{row}.severity",
+        "category": "{row}.category",
+        "status": "{row}.status",
+    }),
+    "ticket_rollup": ("it_tickets", {
+        "day": "substr({row}.created_at, 1, 10)",
+        "priority": "{row}.priority",
+        "status": "{row}.status",
+        "assigned_to": "{row}.assigned_to",
+    }),
+    "dataset_rollup": ("datasets_metadata", {
+        "uploaded_by": "{row}.uploaded_by",
+        "rows": "{row}.rows",
+    }),
+}
+
+
+def _add_rollup_tables(conn):
+    """Per-dimension counts kept up to date by triggers, so charts never aggregate raw rows."""
+    for rollup, (table, dimensions) in ROLLUPS.items():
+        columns = list(dimensions)
+        column_list = ", ".join(columns)
+
+        def values(row):
+            return ", ".join(f"IFNULL({expr.format(row=row)}, '')" for expr in dimensions.values())
+
+        def matches(row):
+            return " AND ".join(
+                f"{column} = IFNULL({expr.format(row=row)}, '')" for column, expr in dimensions.items()
+            )
+
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup} (
+                {", ".join(f"{column} TEXT NOT NULL" for column in columns)},
+                row_count INTEGER NOT NULL,
+                PRIMARY KEY ({column_list})
+            )
+        """)
+
+        add_row = f"""
+            INSERT INTO {rollup} ({column_list}, row_count) VALUES ({values("new")}, 1)
+            ON CONFLICT ({column_list}) DO UPDATE SET row_count = row_count + 1;
+        """
+        remove_row = f"""
+            UPDATE {rollup} SET row_count = row_count - 1 WHERE {matches("old")};
+            DELETE FROM {rollup} WHERE row_count <= 0;
+        """
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_insert AFTER INSERT ON {table} BEGIN {add_row} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_delete AFTER DELETE ON {table} BEGIN {remove_row} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_update AFTER UPDATE ON {table} BEGIN {remove_row} {add_row} END")
+
+        rebuild_rollup(conn, rollup)
+
+
+def rebuild_rollup(conn, rollup):
+    """Recompute a rollup table from scratch (backfill, or repair after manual edits)."""
+    table, dimensions = ROLLUPS[rollup]
+    column_list = ", ".join(dimensions)
+    expressions = ", ".join(f"IFNULL({expr.format(row=table)}, '')" for expr in dimensions.values())
+    conn.execute(f"DELETE FROM {rollup}")
+    conn.execute(f"""
+        INSERT INTO {rollup} ({column_list}, row_count)
+        SELECT {expressions}, COUNT(*) FROM {table} GROUP BY {expressions}
+    """)
+
+
+def _add_table_versions(conn):
+    """A change counter per data table, bumped by triggers on every write, for cache keys."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in TABLE_DDL:
+        conn.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        bump = f"UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';"
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN {bump} END"
+            )
+
+
+# Primary key of each data table
+TABLE_KEYS = {
+    "cyber_incidents": "incident_id",
+    "it_tickets": "ticket_id",
+    "datasets_metadata": "dataset_id",
+}
+
+
+def _add_tombstone_log(conn):
+    """Log every deleted ID so in-memory frames can drop them without a full reload."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS deleted_rows (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            deleted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_deleted_rows_table_seq ON deleted_rows (table_name, seq)")
+    for table, key_column in TABLE_KEYS.items():
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_tombstone AFTER DELETE ON {table} BEGIN
+                INSERT INTO deleted_rows (table_name, row_id) VALUES ('{table}', old.{key_column});
+            END
+        """)
+
+
+# Tables the batch triage job labels
+TRIAGE_TABLES = ("cyber_incidents", "it_tickets")
+
+
+def _add_triage_results(conn):
+    """One row of model output per triaged incident or ticket; rows without one are still unlabelled."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_triage (
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            mitre_technique TEXT,
+            suggested_priority TEXT,
+            summary TEXT,
+            model TEXT,
+            triaged_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+            PRIMARY KEY (table_name, row_id)
+        )
+    """)
+    for table in TRIAGE_TABLES:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_triage_cleanup AFTER DELETE ON {table} BEGIN
+                DELETE FROM ai_triage WHERE table_name = '{table}' AND row_id = old.{TABLE_KEYS[table]};
+            END
+        """)
+
+
+# Where accounts lived before the users table: the login database and the registration text file
+LEGACY_USERS_DB = DATA_DIR / "users.db"
+LEGACY_USERS_TXT = BASE_DIR / "users.txt"
+
+
+def _add_users_table(conn):
+    """
+    Make intelligence.db the one user store (username is UNIQUE, so lookups are indexed)
+    and merge in the accounts from DATA/users.db and users.txt.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'user',
+            email TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+    """)
+
+    # The database first: it has the email and names; the text file only adds accounts it lacks
+    if LEGACY_USERS_DB.exists():
+        legacy = sqlite3.connect(f"file:{LEGACY_USERS_DB}?mode=ro", uri=True)
+        try:
+            rows = legacy.execute(
+                "SELECT username, hashed_password, email, first_name, last_name FROM users ORDER BY id"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            rows = []  # No users table yet
+        finally:
+            legacy.close()
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash, email, first_name, last_name) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [row for row in rows if row[0] and row[1]]
+        )
+
+    if LEGACY_USERS_TXT.exists():
+        with open(LEGACY_USERS_TXT, encoding="utf-8") as f:
+            pairs = [line.strip().split(":", 1) for line in f if ":" in line]
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+            [pair for pair in pairs if pair[0] and pair[1]]
+        )
+
+
+def _add_update_log(conn):
+    """Log every edited ID, like deleted_rows, so in-memory copies can re-read just those rows."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS updated_rows (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now'))
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_updated_rows_table_seq ON updated_rows (table_name, seq)")
+    for table, key_column in TABLE_KEYS.items():
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_update_log AFTER UPDATE ON {table} BEGIN
+                INSERT INTO updated_rows (table_name, row_id) VALUES ('{table}', new.{key_column});
+            END
+        """)
+        # A changed key is the old row going away
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rekey_tombstone AFTER UPDATE OF {key_column} ON {table}
+            WHEN old.{key_column} != new.{key_column} BEGIN
+                INSERT INTO deleted_rows (table_name, row_id) VALUES ('{table}', old.{key_column});
+            END
+        """)
+
+
+# (version, description, function) - append new migrations, never edit old ones
+MIGRATIONS = [
+    (1, "base tables", _create_base_tables),
+    (2, "AUTOINCREMENT primary keys", _use_autoincrement),
+    (3, "filter and sort indexes", _add_filter_indexes),
+    (4, "sortable ISO timestamps", _normalise_timestamps),
+    (5, "FTS5 full-text search", _add_full_text_search),
+    (6, "chart rollup tables", _add_rollup_tables),
+    (7, "per-table change counters", _add_table_versions),
+    (8, "deleted row tombstones", _add_tombstone_log),
+    (9, "AI triage results", _add_triage_results),
+    (10, "single users table", _add_users_table),
+    (11, "edited row log", _add_update_log),
+]
+
+
+def get_schema_version(db_path=DB_PATH):
+    """Return the highest migration applied to the database (0 for a new one)."""
+    with get_connection(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)"
+        )
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def run_migrations(db_path=DB_PATH):
+    """Apply every pending migration in order; returns the list of versions applied."""
+    applied = []
+    if get_schema_version(db_path) >= MIGRATIONS[-1][0]:
+        return applied  # Fast path for every page load after the first
+
+    with get_connection(db_path) as conn:
+        for version, description, migrate in MIGRATIONS:
+            # BEGIN IMMEDIATE takes the write lock, so two workers can't run the same step
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = conn.execute(
+                    "SELECT 1 FROM schema_migrations WHERE version = ?", (version,)
+                ).fetchone()
+                if done:
+                    conn.rollback()
+                    continue
+
+                migrate(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now().isoformat(timespec="seconds"))
+                )
+                conn.commit()
+                applied.append(version)
+            except Exception:
+                conn.rollback()
+                raise
+
+    return applied
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.data.migrations [--db PATH]"""
+    parser = argparse.ArgumentParser(description="Upgrade intelligence.db to the latest schema.")
+    parser.add_argument("--db", default=str(DB_PATH), help=f"Database file (default {DB_PATH})")
+    args = parser.parse_args(argv)
+
+    try:
+        before = get_schema_version(args.db)
+        applied = run_migrations(args.db)
+        if applied:
+            print(f"Schema upgraded from version {before} to {applied[-1]} (applied {applied})")
+        else:
+            print(f"Schema already at version {before}")
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
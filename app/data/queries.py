@@ -0,0 +1,117 @@
+import pandas as pd
+from app.data.db import get_connection
+
+PAGE_SIZE = 50  # Default rows per page
+
+
+def _where_clause(filters, date_column=None, start=None, end=None):
+    """
+    Build a WHERE clause from column filters.
+    A filter value may be a single value or a list (turned into IN); None/empty is ignored.
+    start/end limit date_column to [start, end] (end is inclusive up to the end of that day).
+    """
+    conditions, params = [], []
+
+    for column, value in (filters or {}).items():
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        else:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    if date_column and start is not None:
+        conditions.append(f"{date_column} >= ?")
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S"))
+    if date_column and end is not None:
+        # Timestamps are stored as sortable text, so "< next day" covers the whole end date
+        conditions.append(f"{date_column} < ?")
+        params.append((pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S"))
+
+    return conditions, params
+
+
+def _keyset_condition(sort_column, key_column, descending, after):
+    """
+    Condition selecting the rows that come after the cursor (sort_value, key_value).
+    SQLite sorts NULLs first ascending and last descending, so they are handled explicitly.
+    """
+    sort_value, key_value = after
+    if sort_column == key_column:
+        op = "<" if descending else ">"
+        return f"{key_column} {op} ?", [key_value]
+
+    if descending:
+        if sort_value is None:
+            return f"({sort_column} IS NULL AND {key_column} < ?)", [key_value]
+        return (
+            f"({sort_column} < ? OR ({sort_column} = ? AND {key_column} < ?) OR {sort_column} IS NULL)",
+            [sort_value, sort_value, key_value],
+        )
+
+    if sort_value is None:
+        return f"(({sort_column} IS NULL AND {key_column} > ?) OR {sort_column} IS NOT NULL)", [key_value]
+    return (
+        f"({sort_column} > ? OR ({sort_column} = ? AND {key_column} > ?))",
+        [sort_value, sort_value, key_value],
+    )
+
+
+def fetch_page(table, key_column, sort_columns, filters=None, date_column=None, start=None, end=None,
+               sort_by=None, descending=True, after=None, limit=PAGE_SIZE):
+    """
+    Return one page of a table as (DataFrame, next_cursor) with filtering, sorting and
+    keyset pagination all done in SQL. Pass next_cursor back as after= to get the
+    following page; it is None on the last page.
+    """
+    sort_by = sort_by or key_column
+    if sort_by not in sort_columns:
+        raise ValueError(f"Cannot sort {table} by {sort_by!r}")
+
+    conditions, params = _where_clause(filters, date_column, start, end)
+    if after is not None:
+        condition, cursor_params = _keyset_condition(sort_by, key_column, descending, after)
+        conditions.append(condition)
+        params.extend(cursor_params)
+
+    direction = "DESC" if descending else "ASC"
+    order_by = f"{key_column} {direction}" if sort_by == key_column else f"{sort_by} {direction}, {key_column} {direction}"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # Fetch one extra row to know whether there is a next page
+    query = f"SELECT * FROM {table} {where} ORDER BY {order_by} LIMIT ?"
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params + [limit + 1])
+
+    next_cursor = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        sort_value = last[sort_by]
+        if pd.isna(sort_value):
+            sort_value = None
+        elif hasattr(sort_value, "item"):
+            sort_value = sort_value.item()  # numpy scalar -> plain Python value for sqlite3
+        next_cursor = (sort_value, int(last[key_column]))
+
+    return df, next_cursor
+
+
+def count_rows(table, filters=None, date_column=None, start=None, end=None):
+    """Count the rows matching the same filters fetch_page accepts."""
+    conditions, params = _where_clause(filters, date_column, start, end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+
+
+def distinct_values(table, column):
+    """Sorted distinct non-null values of a column, for filter drop-downs."""
+    with get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}"
+        ).fetchall()
+    return [row[0] for row in rows]
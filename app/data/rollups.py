@@ -0,0 +1,56 @@
+import pandas as pd
+from app.data.db import get_connection
+from app.data.migrations import ROLLUPS, rebuild_rollup
+
+
+def _rollup_counts(rollup, by, numeric=False, **filters):
+    """
+    Counts per value of one rollup dimension, largest first, as a Series shaped like
+    value_counts(). Missing values are left out, as value_counts() does.
+    filters narrow the other dimensions, e.g. status="Open".
+    """
+    dimensions = ROLLUPS[rollup][1]
+    if by not in dimensions or any(column not in dimensions for column in filters):
+        raise ValueError(f"Unknown {rollup} dimension")
+
+    conditions = [f"{by} != ''"]
+    params = []
+    for column, value in filters.items():
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+
+    query = f"""
+        SELECT {by} AS value, SUM(row_count) AS count
+        FROM {rollup}
+        WHERE {" AND ".join(conditions)}
+        GROUP BY {by}
+        ORDER BY count DESC, value
+    """
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    values = [int(float(value)) if numeric else value for value, _ in rows]
+    return pd.Series([count for _, count in rows], index=pd.Index(values, name=by), name="count")
+
+
+def incident_counts(by, day=None, severity=None, category=None, status=None):
+    """Incident counts by day, severity, category or status (read from incident_rollup)."""
+    return _rollup_counts("incident_rollup", by, day=day, severity=severity, category=category, status=status)
+
+
+def ticket_counts(by, day=None, priority=None, status=None, assigned_to=None):
+    """Ticket counts by day, priority, status or assigned_to (read from ticket_rollup)."""
+    return _rollup_counts("ticket_rollup", by, day=day, priority=priority, status=status, assigned_to=assigned_to)
+
+
+def dataset_counts(by, uploaded_by=None):
+    """Dataset counts by uploaded_by or rows (read from dataset_rollup)."""
+    return _rollup_counts("dataset_rollup", by, numeric=(by == "rows"), uploaded_by=uploaded_by)
+
+
+def rebuild_all_rollups():
+    """Recompute every rollup table from the raw tables."""
+    with get_connection() as conn:
+        for rollup in ROLLUPS:
+            rebuild_rollup(conn, rollup)
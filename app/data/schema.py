@@ -0,0 +1,112 @@
+"""
+Compact in-memory column types for the table frames.
+
+Low-cardinality text (severity, status, priority, ...) is held as Categorical,
+timestamps as datetime64 and IDs as the smallest integer dtype that fits.
+Free text (descriptions, subjects) stays as strings.
+"""
+import argparse
+
+import pandas as pd
+from app.data.db import close_all_pools, get_connection
+from pandas.api.types import CategoricalDtype
+
+# Table -> {column: kind}; kinds are "id", "int", "category" and "datetime"
+FRAME_SCHEMAS = {
+    "cyber_incidents": {
+        "incident_id": "id",
+        "timestamp": "datetime",
+        "severity": "category",
+        "category": "category",
+        "status": "category",
+        "incident_type": "category",
+    },
+    "it_tickets": {
+        "ticket_id": "id",
+        "priority": "category",
+        "status": "category",
+        "category": "category",
+        "assigned_to": "category",
+        "created_at": "datetime",
+        "resolution_time_hours": "int",
+    },
+    "datasets_metadata": {
+        "dataset_id": "id",
+        "rows": "int",
+        "columns": "int",
+        "uploaded_by": "category",
+        "upload_date": "datetime",
+    },
+}
+
+
+def _compact_integers(series):
+    """Smallest integer dtype for a column; columns with missing values are left as they are."""
+    if series.isna().any():
+        return series
+    return pd.to_numeric(series, downcast="integer")
+
+
+def apply_schema(df, table):
+    """Convert the columns of a table frame to their compact types (in place) and return it."""
+    for column, kind in FRAME_SCHEMAS[table].items():
+        if column not in df.columns:
+            continue
+        if kind in ("id", "int"):
+            df[column] = _compact_integers(df[column])
+        elif kind == "category":
+            df[column] = df[column].astype("category")
+        elif kind == "datetime":
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+    return df
+
+
+def concat_frames(df, new_rows, table):
+    """
+    Append new_rows to a frame built by apply_schema, keeping the compact types.
+    Categorical columns get the union of both category sets; a plain concat would
+    turn them back into object columns when the categories differ.
+    """
+    new_rows = apply_schema(new_rows, table)
+    for column, kind in FRAME_SCHEMAS[table].items():
+        if kind == "category" and column in df.columns and column in new_rows.columns:
+            # Plain lists: an all-empty column has categories of a different dtype
+            categories = list(df[column].cat.categories) + list(new_rows[column].cat.categories)
+            dtype = CategoricalDtype(pd.unique(pd.Series(categories, dtype=object)))
+            df = df.assign(**{column: df[column].astype(dtype)})
+            new_rows[column] = new_rows[column].astype(dtype)
+    return pd.concat([df, new_rows], ignore_index=True)
+
+
+def memory_report(before, after):
+    """Bytes per column before and after compaction, plus a total row."""
+    report = pd.DataFrame({
+        "before_bytes": before.memory_usage(deep=True, index=False),
+        "after_bytes": after.memory_usage(deep=True, index=False),
+        "before_dtype": before.dtypes.astype(str),
+        "after_dtype": after.dtypes.astype(str),
+    })
+    report.loc["TOTAL"] = [report["before_bytes"].sum(), report["after_bytes"].sum(), "", ""]
+    report["saved_pct"] = (100 * (1 - report["after_bytes"] / report["before_bytes"])).round(1)
+    return report
+
+
+def main(argv=None):
+    """Command-line entry point: python -m app.data.schema [TABLE ...]"""
+    parser = argparse.ArgumentParser(description="Show per-column memory use before and after compact typing.")
+    parser.add_argument("tables", nargs="*", default=list(FRAME_SCHEMAS), help="Tables to report on (default all)")
+    args = parser.parse_args(argv)
+
+    try:
+        for table in args.tables:
+            with get_connection() as conn:
+                before = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+            after = apply_schema(before.copy(), table)
+            print(f"\n{table} ({len(before)} rows)")
+            print(memory_report(before, after).to_string())
+    finally:
+        close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
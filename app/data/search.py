@@ -0,0 +1,84 @@
+import re
+
+import pandas as pd
+from app.data.db import get_connection
+from app.data.migrations import FTS_TABLES
+
+SEARCH_LIMIT = 200  # Most results returned for one query
+
+# "quoted phrases" or single words
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def build_match_query(text, match_all=True):
+    """
+    Turn what the user typed into a safe FTS5 MATCH expression.
+    "Quoted text" is matched as a phrase, bare words as prefixes (phish -> phishing),
+    and all terms must match (any term, with match_all=False; bm25 then ranks rows
+    matching more of them first). Returns None when nothing searchable was typed.
+    """
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(text):
+        if phrase:
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        else:
+            # Strip FTS syntax characters; what is left is matched as a prefix
+            word = re.sub(r'["*^():{}+\-]', " ", word).strip()
+            for part in word.split():
+                terms.append('"' + part + '"*')
+    return (" AND " if match_all else " OR ").join(terms) if terms else None
+
+
+def fts_available(table):
+    """True if the full-text index for table exists (SQLite was built with FTS5)."""
+    fts_table = FTS_TABLES[table][0]
+    with get_connection() as conn:
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)).fetchone()
+    return row is not None
+
+
+def search_table(table, text, limit=SEARCH_LIMIT, match_all=True):
+    """
+    Ranked full-text search over one table. Returns the matching rows (best match first)
+    as a DataFrame; a purely numeric query also matches the row with that ID.
+    """
+    fts_table, key_column, _ = FTS_TABLES[table]
+    match_query = build_match_query(text, match_all)
+    if match_query is None:
+        return pd.DataFrame()
+
+    query = f"""
+        SELECT t.*
+        FROM {fts_table} AS f
+        JOIN {table} AS t ON t.{key_column} = f.rowid
+        WHERE {fts_table} MATCH ?
+        ORDER BY bm25({fts_table})
+        LIMIT ?
+    """
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=(match_query, limit))
+
+        # Searching for an ID should find that record first
+        if text.strip().isdigit():
+            by_id = pd.read_sql_query(
+                f"SELECT * FROM {table} WHERE {key_column} = ?", conn, params=(int(text.strip()),)
+            )
+            if not by_id.empty:
+                df = pd.concat([by_id, df[df[key_column] != by_id[key_column].iloc[0]]], ignore_index=True)
+
+    return df
+
+
+def search_incidents(text, limit=SEARCH_LIMIT):
+    """Full-text search over cyber_incidents (ranked, prefix and "phrase" matching)."""
+    return search_table("cyber_incidents", text, limit)
+
+
+def search_tickets(text, limit=SEARCH_LIMIT):
+    """Full-text search over it_tickets (ranked, prefix and "phrase" matching)."""
+    return search_table("it_tickets", text, limit)
+
+
+def search_datasets(text, limit=SEARCH_LIMIT):
+    """Full-text search over datasets_metadata (ranked, prefix and "phrase" matching)."""
+    return search_table("datasets_metadata", text, limit)
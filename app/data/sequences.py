@@ -0,0 +1,55 @@
+"""
+ID allocation for the data tables.
+
+Single inserts get their ID from AUTOINCREMENT (add_incident and friends
+return it). When IDs are needed before the rows are written, as in bulk
+imports, reserve_ids claims a block from the same counter SQLite uses
+(sqlite_sequence). AUTOINCREMENT never hands out an ID at or below that
+counter, so a reserved block can't collide with concurrent inserts.
+"""
+import pandas as pd
+from app.data.db import DB_PATH, get_connection
+from app.data.migrations import TABLE_KEYS
+
+
+def reserve_ids(table, count=1, db_path=DB_PATH):
+    """Reserve count consecutive IDs for table; returns them as a range. O(1), safe across processes."""
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    key_column = TABLE_KEYS[table]
+
+    with get_connection(db_path) as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")  # Take the write lock before reading the counter
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        if row is None:
+            # Nothing allocated yet; start above any IDs that were imported explicitly
+            last = conn.execute(f"SELECT COALESCE(MAX({key_column}), 0) FROM {table}").fetchone()[0]
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, last + count))
+        else:
+            last = row[0]
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (last + count, table))
+
+    return range(last + 1, last + count + 1)
+
+
+def next_id(table, db_path=DB_PATH):
+    """Reserve and return a single ID for table."""
+    return reserve_ids(table, 1, db_path)[0]
+
+
+def fill_missing_ids(df, table):
+    """Give rows with no ID (or a frame with no ID column) IDs from one reserved block."""
+    key_column = TABLE_KEYS[table]
+    if key_column not in df.columns:
+        df = df.assign(**{key_column: float("nan")})
+
+    # Float holds the new IDs alongside any blanks (pd.NA, None and numeric strings included).
+    # Converted before reserving, so a column that can't be converted doesn't waste a block
+    df = df.assign(**{key_column: pd.to_numeric(df[key_column]).astype("float64")})
+
+    missing = df[key_column].isna()
+    if missing.any():
+        ids = reserve_ids(table, int(missing.sum()))
+        df.loc[missing, key_column] = list(ids)
+    return df
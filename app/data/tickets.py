@@ -1,121 +1,140 @@
-import sqlite3
 import pandas as pd
-
-
-def connect_database(db_path="DATA/intelligence.db"):
-    """Connect to the SQLite database."""
-    return sqlite3.connect(db_path)
+from app.data.bulk import BULK_CHUNK_SIZE, bulk_upsert, frame_to_rows
+from app.data.csv_store import mirror_delete, mirror_insert
+from app.data.db import get_connection
+from app.data.migrations import run_migrations
+from app.data.queries import PAGE_SIZE, count_rows, fetch_page
+from app.data.sequences import fill_missing_ids
+
+# Table columns and the type each one is stored as
+TICKET_COLUMNS = {
+    "ticket_id": "int",
+    "priority": "text",
+    "status": "text",
+    "category": "text",
+    "subject": "text",
+    "description": "text",
+    "assigned_to": "text",
+    "created_at": "timestamp",
+    "resolution_time_hours": "int",
+}
 
 
 def create_it_tickets_table():
-    """Create the it_tickets table if it doesn't exist."""
-    conn = connect_database()  # Use existing connection function
-    cursor = conn.cursor()
-
-    # SQL query to create the table
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS it_tickets (
-        ticket_id INTEGER PRIMARY KEY,
-        priority TEXT,
-        status TEXT,
-        description TEXT,
-        assigned_to TEXT,
-        created_at TEXT,
-        resolution_time_hours INTEGER
-    )
-    """
-
-    # Execute the query to create the table
-    cursor.execute(create_table_query)
-    conn.commit()  # Commit the transaction
-    conn.close()  # Close the connection
+    """Create the it_tickets table if it doesn't exist and apply pending migrations."""
+    run_migrations()
 
 
 def insert_ticket(ticket_id, priority, description, status, assigned_to,
                   created_at, resolution_time_hours):
     """Insert a new IT ticket if it doesn't already exist."""
-    conn = connect_database()  # Use existing connection function
-    cursor = conn.cursor()
+    with get_connection() as conn:  # Pooled connection, committed when the block exits
+        cursor = conn.cursor()
+
+        # Check if the ticket already exists
+        cursor.execute("SELECT COUNT(*) FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
+        if cursor.fetchone()[0] > 0:
+            print(f"Ticket ID {ticket_id} already exists, skipping insert.")
+            return None  # Optionally return None or the existing ticket's ID
+
+        # SQL query to insert ticket data
+        insert_query = """
+            INSERT INTO it_tickets
+            (ticket_id, priority, status, description, assigned_to,
+             created_at, resolution_time_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
 
-    # Check if the ticket already exists
-    cursor.execute("SELECT COUNT(*) FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
-    if cursor.fetchone()[0] > 0:
-        print(f"Ticket ID {ticket_id} already exists, skipping insert.")
-        conn.close()
-        return None  # Optionally return None or the existing ticket's ID
+        # Execute the query with parameters
+        cursor.execute(insert_query, (ticket_id, priority, status, description, assigned_to,
+                                      created_at, resolution_time_hours))
 
-    # SQL query to insert ticket data
+        ticket_row_id = cursor.lastrowid  # Get the last inserted row ID
+
+    return ticket_row_id
+
+
+def add_ticket(priority, status, category, subject, description, assigned_to, created_at):
+    """Insert one IT ticket and return the ID SQLite assigned to it."""
     insert_query = """
         INSERT INTO it_tickets
-        (ticket_id, priority, status, description, assigned_to,
-         created_at, resolution_time_hours)
+        (priority, status, category, subject, description, assigned_to, created_at)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """
+    with get_connection() as conn:
+        cursor = conn.execute(insert_query, (priority, status, category, subject, description,
+                                             assigned_to, created_at))
+        ticket_id = cursor.lastrowid  # Allocated by the database, never by the page
 
-    # Execute the query with parameters
-    cursor.execute(insert_query, (ticket_id, priority, status, description, assigned_to,
-                                  created_at, resolution_time_hours))
+    mirror_insert("it_tickets", {
+        "ticket_id": ticket_id, "priority": priority, "status": status, "category": category,
+        "subject": subject, "description": description, "assigned_to": assigned_to, "created_at": created_at,
+    })
+    return ticket_id
 
-    conn.commit()  # Commit the transaction
-    ticket_row_id = cursor.lastrowid  # Get the last inserted row ID
-    conn.close()  # Close the connection
 
-    return ticket_row_id
+def delete_ticket(ticket_id):
+    """Delete one IT ticket; returns True if a row was removed."""
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
+        deleted = cursor.rowcount > 0
+
+    if deleted:
+        mirror_delete("it_tickets", ticket_id)
+    return deleted
 
 
 def get_all_tickets():
     """Return all tickets as a DataFrame."""
-    conn = connect_database()  # Use existing connection function
     query = "SELECT * FROM it_tickets"  # Store the query for readability
-    df = pd.read_sql_query(query, conn)  # Execute the query and load results into a DataFrame
-    conn.close()  # Close the connection
+    with get_connection() as conn:
+        df = pd.read_sql_query(query, conn)  # Execute the query and load results into a DataFrame
     return df
 
 
-def insert_tickets_from_csv(csv_file_path):
-    """Insert tickets into the database from a CSV file."""
+# Columns the tickets table can be sorted by
+TICKET_SORT_COLUMNS = ("ticket_id", "created_at", "priority", "status", "assigned_to")
+
+
+def query_tickets(priority=None, status=None, category=None, assigned_to=None, start=None, end=None,
+                  sort_by="ticket_id", descending=True, after=None, limit=PAGE_SIZE):
+    """
+    Return one page of tickets as (DataFrame, next_cursor).
+    priority/status/category/assigned_to take a value or a list; start/end bound created_at.
+    Pass next_cursor back as after= to fetch the next page.
+    """
+    return fetch_page(
+        "it_tickets", "ticket_id", TICKET_SORT_COLUMNS,
+        filters={"priority": priority, "status": status, "category": category, "assigned_to": assigned_to},
+        date_column="created_at", start=start, end=end,
+        sort_by=sort_by, descending=descending, after=after, limit=limit
+    )
+
+
+def count_tickets(priority=None, status=None, category=None, assigned_to=None, start=None, end=None):
+    """Count the tickets matching the same filters as query_tickets."""
+    return count_rows(
+        "it_tickets",
+        filters={"priority": priority, "status": status, "category": category, "assigned_to": assigned_to},
+        date_column="created_at", start=start, end=end
+    )
+
+
+def insert_tickets_from_frame(df, chunk_size=BULK_CHUNK_SIZE):
+    """Bulk insert tickets from a DataFrame, skipping IDs that already exist."""
+    df = fill_missing_ids(df, "it_tickets")  # Rows without an ID get one from a single reserved block
+    rows = frame_to_rows(df, TICKET_COLUMNS)  # Typed tuples, converted column by column
+    return bulk_upsert("it_tickets", list(TICKET_COLUMNS), rows,
+                       conflict_column="ticket_id", chunk_size=chunk_size)
+
+
+def insert_tickets_from_csv(csv_file_path, chunk_size=BULK_CHUNK_SIZE):
+    """Insert tickets into the database from a CSV file; returns inserted/skipped counts."""
     # Read the CSV file into a DataFrame
     df = pd.read_csv(csv_file_path)
 
     # Check if DataFrame is empty
     if df.empty:
-        print("CSV file is empty!")
-        return
-
-    # Print the contents of the DataFrame to verify
-    print("Data from CSV:", df.head())  # Display first few rows of the DataFrame
-
-    # Insert each row of the DataFrame into the SQLite table
-    for _, row in df.iterrows():
-        ticket_id = row.get('ticket_id')
-        priority = row.get('priority')
-        status = row.get('status')
-        description = row.get('description')
-        assigned_to = row.get('assigned to')  # Adjusted for the column name
-        created_at = row.get('created_at')  # Adjusted for the column name
-        resolution_time_hours = row.get('resolution_time_hours')  # Adjusted for the column name
-
-        print(f"Inserting ticket: {ticket_id}, {description}")  # Debugging output
-
-        insert_ticket(
-            ticket_id=ticket_id,
-            priority=priority,
-            status=status,
-            description=description,
-            assigned_to=assigned_to,
-            created_at=created_at,
-            resolution_time_hours=resolution_time_hours
-        )
-
-    print("All tickets inserted successfully!")
-
-# Create the table if it doesn't exist
-create_it_tickets_table()
-
-# Example usage: Insert tickets from a CSV file into the database
-csv_file_path = r'C:\Users\ali08\PycharmProjects\CourseworkAttempt\DATA\it_tickets.csv'
-insert_tickets_from_csv(csv_file_path)
-
-# Fetch all tickets from the database
-tickets_df = get_all_tickets()
-print("Tickets from DB:", tickets_df)
\ No newline at end of file
+        return {"inserted": 0, "skipped": 0}
+
+    return insert_tickets_from_frame(df, chunk_size=chunk_size)
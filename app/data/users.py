@@ -1,24 +1,69 @@
-from app.data.db import connect_database
+import sqlite3
+import threading
+
+from app.data.db import get_connection
+from models.user import User
+
+# username -> User, filled on first lookup; an account never changes once registered,
+# so only registration has to touch it
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
 
 def get_user_by_username(username):
-    """Retrieve user by username."""
-    conn = connect_database()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM users WHERE username = ?",
-        (username,)
-    )
-    user = cursor.fetchone()
-    conn.close()
+    """Retrieve user by username (indexed: username is UNIQUE)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, username, password_hash, role, email, first_name, last_name, created_at "
+            "FROM users WHERE username = ?",
+            (username,)
+        )
+        user = cursor.fetchone()
+    return user
+
+
+def get_user(username):
+    """The User for username, or None. Served from memory after the first lookup."""
+    user = _user_cache.get(username)
+    if user is None:
+        row = get_user_by_username(username)
+        if row is None:
+            return None  # Not cached, so an account registered later is found
+        user = User(username=row[1], email=row[4], password=row[2], first_name=row[5], last_name=row[6])
+        with _user_cache_lock:
+            _user_cache[username] = user
     return user
 
-def insert_user(username, password_hash, role='user'):
-    """Insert new user."""
-    conn = connect_database()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-        (username, password_hash, role)
+
+def user_exists(username):
+    return get_user(username) is not None
+
+
+def insert_user(username, password_hash, role='user', email=None, first_name=None, last_name=None):
+    """Insert new user. Returns False if the username is already taken."""
+    try:
+        with get_connection() as conn:  # Committed when the block exits
+            conn.execute(
+                "INSERT INTO users (username, password_hash, role, email, first_name, last_name) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (username, password_hash, role, email, first_name, last_name)
+            )
+    except sqlite3.IntegrityError:
+        return False  # UNIQUE username: two registrations can't both win
+    finally:
+        with _user_cache_lock:
+            _user_cache.pop(username, None)
+    return True
+
+
+def register_user(user):
+    """Store a new User (password already hashed). Returns False if the username is taken."""
+    return insert_user(
+        user.username, user.password, email=user.email, first_name=user.first_name, last_name=user.last_name
     )
-    conn.commit()
-    conn.close()
\ No newline at end of file
+
+
+def clear_user_cache():
+    with _user_cache_lock:
+        _user_cache.clear()
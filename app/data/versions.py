@@ -0,0 +1,9 @@
+from app.data.db import get_connection
+
+
+def table_version(table):
+    """Change counter for a data table; bumped by triggers on every insert, update or delete."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+
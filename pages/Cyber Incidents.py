@@ -1,20 +1,38 @@
 import streamlit as st
 import pandas as pd
-import os
-import openai
 import plotly.express as px
 
+from app.ai.assistant import get_conversation, stream_answer
+from app.ai.context import build_context
+from app.ai.similar import SimilarityIndex, matching_rows
+from app.data.cache import shared_frame
+from app.data.incidents import (
+    INCIDENT_SORT_COLUMNS, add_incident, count_incidents, create_incidents_table,
+    delete_incident, query_incidents,
+)
+from app.data.frame_search import search_frame
+from app.data.queries import distinct_values
+from app.data.rollups import incident_counts
+from app.data.search import fts_available, search_incidents
+
 # Page title and icon
 st.set_page_config(
     page_title="Cyber Incidents",
     page_icon="🛡️",
 )
 
-# Directory safety
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "DATA"))
-CSV_PATH = os.path.join(DATA_DIR, "cyber_incidents.csv")
-os.makedirs(DATA_DIR, exist_ok=True)
+# Database safety (runs once per server process, not on every rerun)
+@st.cache_resource
+def init_incidents_table():
+    create_incidents_table()
+
+init_incidents_table()
+
+
+# Similarity index over incident text, memory-mapped and shared by every session
+@st.cache_resource
+def load_incident_index():
+    return SimilarityIndex("cyber_incidents")
 
 # Session safety (login check)
 if "logged_in" not in st.session_state:
@@ -28,52 +46,25 @@ if not st.session_state.logged_in or not st.session_state.username:
         st.switch_page("Home.py")
     st.stop()
 
-# OPENROUTER Client Configuration
+# OPENROUTER Client Configuration (the shared streaming client reads the key from secrets)
 if "OPENAI_API_KEY" not in st.secrets:
     st.error("API key is missing. Please set OPENAI_API_KEY in secrets.")
     st.stop()
 
-openrouter_api_key = st.secrets["OPENAI_API_KEY"]
-openai.api_key = openrouter_api_key
-openai.api_base = "https://openrouter.ai/api/v1"
-
-# Load CSV
-@st.cache_data
-def load_incidents():
-    """Loads cyber_incidents.csv or returns an empty DataFrame."""
-    expected_cols = [
-        "incident_id", "timestamp", "incident_type", "severity",
-        "category", "status", "description"
-    ]
-
-    if not os.path.exists(CSV_PATH):
-        st.warning(f"CSV not found at `{CSV_PATH}` — creating a new one.")
-        df = pd.DataFrame(columns=expected_cols)
-        df.to_csv(CSV_PATH, index=False)
-        return df
-
-    try:
-        df = pd.read_csv(CSV_PATH)
-
-        # Ensure all expected columns exist
-        for col in expected_cols:
-            if col not in df.columns:
-                df[col] = None
-
-        # fix timestamp
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
 
-        return df
-
-    except Exception as e:
-        st.error(f"Failed to load CSV: {e}")
-        return pd.DataFrame(columns=expected_cols)
+# Filter drop-down options, cached until the incidents table changes
+@st.cache_data(max_entries=4)
+def load_incident_filter_options(version):
+    return {
+        "severity": distinct_values("cyber_incidents", "severity"),
+        "status": distinct_values("cyber_incidents", "status"),
+        "category": distinct_values("cyber_incidents", "category"),
+    }
 
-# Load into session
-if "df" not in st.session_state:
-    st.session_state.df = load_incidents()
-
-df = st.session_state.df
+# Load incidents once per server process; every session shares that one frame
+# and reruns merge in only the rows added or deleted since
+incident_sync, _ = shared_frame("cyber_incidents")
+df = incident_sync.df
 
 # Page UI
 st.title("📊 Cyber Incident Records")
@@ -81,8 +72,9 @@ st.write(f"Welcome, **{st.session_state.username}**! Explore and analyze cyberse
 
 # Refresh table button
 if st.button("Refresh Table"):
-    st.session_state.df = load_incidents()  # Reload data from CSV
-    df = st.session_state.df
+    sync_stats = incident_sync.refresh()  # Fetches only new rows and tombstoned IDs
+    df = incident_sync.df
+    st.caption(f"Refreshed: {sync_stats['added']} added, {sync_stats['updated']} updated, {sync_stats['removed']} removed")
 
 # Main table display with search bar
 st.subheader("Cyber Incident Table")
@@ -93,18 +85,72 @@ search_query = st.text_input(
     placeholder="Search by ID, type, category, severity, status, description..."
 )
 
+# Filters and sorting (pushed down into SQL, only the visible page is fetched)
+filter_options = load_incident_filter_options(incident_sync.version)
+filter_col1, filter_col2, filter_col3 = st.columns(3)
+severity_filter = filter_col1.multiselect("Severity", filter_options["severity"])
+status_filter = filter_col2.multiselect("Status", filter_options["status"])
+category_filter = filter_col3.multiselect("Category", filter_options["category"])
+date_range = st.date_input("Date range", value=())
+
+sort_col1, sort_col2, sort_col3 = st.columns(3)
+sort_by = sort_col1.selectbox("Sort by", INCIDENT_SORT_COLUMNS)
+descending = sort_col2.selectbox("Order", ["Descending", "Ascending"]) == "Descending"
+page_size = sort_col3.selectbox("Rows per page", [25, 50, 100], index=1)
+
 # Apply filtering
 if search_query:
-    query = search_query.lower()
-    filtered_df = df[df.apply(lambda row: row.astype(str).str.lower().str.contains(query).any(), axis=1)]
+    if fts_available("cyber_incidents"):
+        # Ranked full-text lookup in the database instead of scanning every row
+        filtered_df = search_incidents(search_query)
+        if not filtered_df.empty:
+            filtered_df["timestamp"] = pd.to_datetime(filtered_df["timestamp"], errors="coerce")
+    else:
+        filtered_df = search_frame(df, search_query)  # Vectorised scan of the loaded frame
+
+    # Display filtered table
+    if not filtered_df.empty:
+        st.dataframe(filtered_df)
+    else:
+        st.warning("No incidents match your search.")
 else:
-    filtered_df = df
-
-# Display filtered or full table
-if not filtered_df.empty:
-    st.dataframe(filtered_df)
-else:
-    st.warning("No incidents match your search.")
+    start_date, end_date = (tuple(date_range) + (None, None))[:2]  # 0, 1 or 2 dates picked
+    filters = {
+        "severity": severity_filter,
+        "status": status_filter,
+        "category": category_filter,
+        "start": start_date,
+        "end": end_date,
+    }
+
+    # New filters or sort order: go back to the first page
+    filter_key = (str(filters), sort_by, descending, page_size)
+    if st.session_state.get("incident_filter_key") != filter_key:
+        st.session_state.incident_filter_key = filter_key
+        st.session_state.incident_cursors = [None]  # Cursor that starts each visited page
+
+    cursors = st.session_state.incident_cursors
+    page_df, next_cursor = query_incidents(
+        **filters, sort_by=sort_by, descending=descending, after=cursors[-1], limit=page_size
+    )
+    total_matching = count_incidents(**filters)
+
+    # Display the current page
+    if not page_df.empty:
+        page_df["timestamp"] = pd.to_datetime(page_df["timestamp"], errors="coerce")
+        st.dataframe(page_df)
+    else:
+        st.warning("No incidents match your filters.")
+
+    total_pages = max(1, -(-total_matching // page_size))
+    nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+    nav_info.caption(f"Page {len(cursors)} of {total_pages} · {total_matching} matching incidents")
+    if nav_prev.button("◀ Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if nav_next.button("Next ▶", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
 
 # Delete incident feature
 st.subheader("🗑️ Delete an Incident")
@@ -116,12 +162,10 @@ if st.button("Delete Incident") and incident_id_to_delete:
         # Convert input to integer for matching incident_id
         incident_id_to_delete = int(incident_id_to_delete)
 
-        if incident_id_to_delete in df["incident_id"].values:
-            # Delete row
-            df = df[df["incident_id"] != incident_id_to_delete]
-            df.to_csv(CSV_PATH, index=False)
-
-            st.session_state.df = df
+        # Delete just this row in the database
+        if delete_incident(incident_id_to_delete):
+            incident_sync.refresh()  # Drops just this row from the in-memory frame
+            df = incident_sync.df
             st.success(f"Incident with ID {incident_id_to_delete} has been deleted.")
         else:
             st.error(f"Incident ID {incident_id_to_delete} not found.")
@@ -146,27 +190,44 @@ with st.form(key="add_incident_form"):
         if not all([incident_type, incident_category, incident_severity, incident_status, incident_description]):
             st.error("All fields are required.")
         else:
-            new_incident = {
-                "incident_id": int(df["incident_id"].max() + 1) if not df.empty else 1000,
-                "timestamp": pd.to_datetime("now"),
-                "incident_type": incident_type,
-                "severity": incident_severity,
-                "category": incident_category,
-                "status": incident_status,
-                "description": incident_description
-            }
-
-            new_incident_df = pd.DataFrame([new_incident])
-            df = pd.concat([df, new_incident_df], ignore_index=True)
-
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-            df.to_csv(CSV_PATH, index=False)
-
-            st.session_state.df = df
+            timestamp = pd.Timestamp.now().floor("s")
+
+            # Single-row INSERT; the database allocates the incident_id
+            add_incident(
+                timestamp=timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                severity=incident_severity,
+                category=incident_category,
+                status=incident_status,
+                description=incident_description,
+                incident_type=incident_type
+            )
+
+            incident_sync.refresh()  # Appends just the new row to the in-memory frame
+            df = incident_sync.df
             st.success("Incident added successfully!")
 
-# Charts
-severity_counts = df['severity'].value_counts()
+# Similar incidents
+st.subheader("🔎 Find Similar Incidents")
+
+similar_query = st.text_input("Incident ID or a description to match:")
+
+if similar_query:
+    incident_index = load_incident_index()
+    incident_index.update()  # Embeds only rows added (and drops rows deleted) since the last lookup
+    if similar_query.strip().isdigit():
+        matches = incident_index.similar_to(int(similar_query))
+    else:
+        matches = incident_index.query([similar_query])[0]
+
+    if matches is None:
+        st.error(f"Incident ID {similar_query.strip()} not found.")
+    elif matches:
+        st.dataframe(matching_rows(df, "cyber_incidents", matches))
+    else:
+        st.warning("No similar incidents found.")
+
+# Charts (read from the incident_rollup table instead of aggregating every row)
+severity_counts = incident_counts("severity")
 
 fig_bar = px.bar(
     x=severity_counts.index,
@@ -177,7 +238,7 @@ fig_bar = px.bar(
 st.subheader("Incident Severity Distribution")
 st.plotly_chart(fig_bar)
 
-category_counts = df['category'].value_counts()
+category_counts = incident_counts("category")
 
 fig_pie = px.pie(
     names=category_counts.index,
@@ -192,55 +253,36 @@ st.plotly_chart(fig_pie)
 # AI assistant
 st.subheader("Cybersecurity AI Assistant")
 
-def df_to_text(dframe):
-    return dframe.head(40).to_csv(index=False)
-
-incident_text = df_to_text(df)
-
-# Chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a cybersecurity expert assistant. Analyze cyber incidents, "
-                "detect threat patterns, map to MITRE ATT&CK, and provide actionable advice."
-            )
-        }
-    ]
+# Chat history (this page's own; older turns are folded into a running summary)
+chat = get_conversation(
+    "cyber_incidents",
+    "You are a cybersecurity expert assistant. Analyze cyber incidents, "
+    "detect threat patterns, map to MITRE ATT&CK, and provide actionable advice."
+)
 
 if st.button("Clear Chat"):
-    st.session_state.messages = st.session_state.messages[:1]
+    chat.clear()
     st.rerun()
 
-for msg in st.session_state.messages:
-    if msg["role"] != "system":
-        st.chat_message(msg["role"]).markdown(msg["content"])
+for msg in chat.transcript:
+    st.chat_message(msg["role"]).markdown(msg["content"])
 
 prompt = st.chat_input("Ask the Cybersecurity AI Assistant...")
 
 if prompt:
     st.chat_message("user").markdown(prompt)
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    chat.add("user", prompt)
 
-    api_messages = st.session_state.messages + [
-        {
-            "role": "system",
-            "content": f"Here is the cyber incident dataset (first 40 rows):\n\n{incident_text}"
-        }
-    ]
+    # Built only now: whole-table counts plus the incidents relevant to this question
+    context = build_context("cyber_incidents", prompt, df)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="openai/gpt-3.5-turbo",
-            messages=api_messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-
-        ai_msg = response.choices[0].message["content"]
-        st.chat_message("assistant").markdown(ai_msg)
-        st.session_state.messages.append({"role": "assistant", "content": ai_msg})
+        # Tokens are shown as they arrive (or at once, for a repeated question); write_stream returns the full answer
+        tokens, from_cache = stream_answer(chat.api_messages(), context, temperature=0.7, max_tokens=500)
+        ai_msg = st.chat_message("assistant").write_stream(tokens)
+        if from_cache:
+            st.caption("Answered from cache (same question, unchanged data)")
+        chat.add("assistant", ai_msg)
 
     except Exception as e:
         st.error(f"Error from OpenRouter API: {e}")
\ No newline at end of file
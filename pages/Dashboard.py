@@ -1,7 +1,13 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from app.data.cache import shared_frame
+from app.data.migrations import run_migrations
+from app.data.rollups import incident_counts
+
 # Page title and icon
 st.set_page_config(
     page_title="Dashboard",
@@ -18,17 +24,31 @@ if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
 
     st.stop()
 
-st.title("📊 Cyber Incidents Dashboard")
+# Make sure the database schema (including the chart rollups) is up to date, once per process
+@st.cache_resource
+def init_database():
+    run_migrations()
 
-# Load the CSV
-df = pd.read_csv(r'C:\Users\ali08\PycharmProjects\CourseworkAttempt\DATA\cyber_incidents.csv')
+init_database()
 
-# Display dataset information for specific columns
-st.subheader("Dataset Information")
+st.title("📊 Cyber Incidents Dashboard")
 
 # Specify the columns of interest
 columns_of_interest = ["incident_id", "timestamp", "severity", "category", "status", "description", "incident_type"]
 
+# These are all of the table's columns, so use the whole-table frame the other pages
+# share instead of a second copy of it; reruns merge in only what changed since
+start = time.perf_counter()
+incident_sync, sync_stats = shared_frame("cyber_incidents")
+df = incident_sync.df
+st.caption(
+    f"Loaded {len(df)} incidents in {(time.perf_counter() - start) * 1000:.0f} ms "
+    f"({'full load' if sync_stats['full_reload'] else 'kept in memory, changes merged'})"
+)
+
+# Display dataset information for specific columns
+st.subheader("Dataset Information")
+
 # Display non-null count for each of the specified columns
 column_summary = pd.DataFrame({
     "Column Name": columns_of_interest,
@@ -42,14 +62,15 @@ st.dataframe(column_summary)
 st.subheader("Dataset")
 st.dataframe(df)
 
-# Pie Chart
+# Pie Chart (counts come from the incident_rollup table, not the raw rows)
 st.subheader("Pie Chart – Severity Breakdown")
-fig = px.pie(df, names="severity", title="Incidents by Severity")
+severity_counts = incident_counts("severity")
+fig = px.pie(names=severity_counts.index, values=severity_counts.values, title="Incidents by Severity")
 st.plotly_chart(fig, use_container_width=True)
 
 # Bar Chart
 st.subheader("Bar Chart – Category Count")
-bar_data = df["category"].value_counts().reset_index()
+bar_data = incident_counts("category").reset_index()
 bar_data.columns = ["category", "count"]
 
 fig = px.bar(bar_data, x="category", y="count", title="Incidents by Category")
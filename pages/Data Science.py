@@ -1,20 +1,26 @@
 import streamlit as st
-import pandas as pd
-import os
-import openai  # OpenRouter via OpenAI SDK
 import plotly.express as px  # For plotting charts
 
+from app.ai.assistant import get_conversation, stream_answer
+from app.ai.context import build_context
+from app.data.cache import shared_frame
+from app.data.datasets import add_dataset, create_datasets_metadata_table, delete_dataset
+from app.data.frame_search import search_frame
+from app.data.rollups import dataset_counts
+from app.data.search import fts_available, search_datasets
+
 # Page title and icon
 st.set_page_config(
     page_title="Data Science",
     page_icon="📉",
 )
 
-# DIRECTORY SAFETY for Datasets Metadata
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "DATA"))
-DATASETS_METADATA_CSV_PATH = os.path.join(DATA_DIR, "datasets_metadata.csv")
-os.makedirs(DATA_DIR, exist_ok=True)
+# DATABASE SAFETY for Datasets Metadata (runs once per server process, not on every rerun)
+@st.cache_resource
+def init_datasets_metadata_table():
+    create_datasets_metadata_table()
+
+init_datasets_metadata_table()
 
 # SESSION SAFETY (login check)
 if "logged_in" not in st.session_state:
@@ -28,43 +34,10 @@ if not st.session_state.logged_in or not st.session_state.username:
         st.switch_page("Home.py")
     st.stop()
 
-# LOAD Datasets Metadata CSV
-@st.cache_data
-def load_datasets_metadata():
-    """Loads datasets_metadata.csv or returns an empty DataFrame."""
-    expected_cols = [
-        "dataset_id", "name", "rows", "columns", "uploaded_by", "upload_date"
-    ]
-
-    if not os.path.exists(DATASETS_METADATA_CSV_PATH):
-        st.warning(f"CSV not found at `{DATASETS_METADATA_CSV_PATH}` — creating a new one.")
-        df = pd.DataFrame(columns=expected_cols)
-        df.to_csv(DATASETS_METADATA_CSV_PATH, index=False)
-        return df
-
-    try:
-        df = pd.read_csv(DATASETS_METADATA_CSV_PATH)
-
-        # Ensure all expected columns exist
-        for col in expected_cols:
-            if col not in df.columns:
-                df[col] = None
-
-        # Fix upload_date
-        df["upload_date"] = pd.to_datetime(df["upload_date"], errors="coerce")
-
-        return df
-
-    except Exception as e:
-        st.error(f"Failed to load CSV: {e}")
-        return pd.DataFrame(columns=expected_cols)
-
-
-# Load Datasets Metadata into session
-if "df_datasets_metadata" not in st.session_state:
-    st.session_state.df_datasets_metadata = load_datasets_metadata()
-
-df_datasets_metadata = st.session_state.df_datasets_metadata
+# Load Datasets Metadata once per server process; every session shares that one frame
+# and reruns merge in only the rows added or deleted since
+dataset_sync, _ = shared_frame("datasets_metadata")
+df_datasets_metadata = dataset_sync.df
 
 # Datasets Metadata PAGE UI
 st.title("📊 Datasets Metadata Records")
@@ -78,9 +51,11 @@ search_term = st.text_input("Search for a dataset (name, uploaded_by, etc.):")
 
 # Filtering the DataFrame based on the search term
 if search_term:
-    filtered_df = df_datasets_metadata[
-        df_datasets_metadata.apply(lambda row: row.astype(str).str.contains(search_term, case=False).any(), axis=1)
-    ]
+    if fts_available("datasets_metadata"):
+        # Ranked full-text lookup in the database instead of scanning every row
+        filtered_df = search_datasets(search_term)
+    else:
+        filtered_df = search_frame(df_datasets_metadata, search_term)  # Vectorised scan of the loaded frame
 else:
     filtered_df = df_datasets_metadata  # If no search term, show all datasets
 
@@ -91,8 +66,12 @@ else:
 
 # BUTTON TO REFRESH THE TABLE
 if st.button("Refresh Datasets Metadata Table"):
-    st.session_state.df_datasets_metadata = load_datasets_metadata()  # Reload datasets from CSV
-    st.success("Datasets Metadata Table has been refreshed.")
+    sync_stats = dataset_sync.refresh()  # Fetches only new rows and tombstoned IDs
+    df_datasets_metadata = dataset_sync.df
+    st.success(
+        f"Datasets Metadata Table has been refreshed "
+        f"({sync_stats['added']} added, {sync_stats['updated']} updated, {sync_stats['removed']} removed)."
+    )
 
 # ADD DATASET FORM
 st.subheader("➕ Add New Dataset")
@@ -110,23 +89,17 @@ with st.form(key="add_dataset_form"):
         if not all([dataset_name, rows, columns, uploaded_by, upload_date]):
             st.error("❌ All fields are required.")
         else:
-            new_dataset = {
-                "dataset_id": int(
-                    df_datasets_metadata["dataset_id"].max() + 1) if not df_datasets_metadata.empty else 1000,
-                "name": dataset_name,
-                "rows": rows,
-                "columns": columns,
-                "uploaded_by": uploaded_by,
-                "upload_date": pd.to_datetime(upload_date)
-            }
-
-            new_dataset_df = pd.DataFrame([new_dataset])
-            df_datasets_metadata = pd.concat([df_datasets_metadata, new_dataset_df], ignore_index=True)
-
-            df_datasets_metadata.to_csv(DATASETS_METADATA_CSV_PATH, index=False)
-
-            # Update the session state
-            st.session_state.df_datasets_metadata = df_datasets_metadata
+            # Single-row INSERT; the database allocates the dataset_id
+            add_dataset(
+                name=dataset_name,
+                rows=int(rows),
+                columns=int(columns),
+                uploaded_by=uploaded_by,
+                upload_date=upload_date.isoformat()
+            )
+
+            dataset_sync.refresh()  # Appends just the new row to the in-memory frame
+            df_datasets_metadata = dataset_sync.df
             st.success("✅ Dataset added successfully!")
 
 # DELETE DATASET FEATURE
@@ -138,15 +111,10 @@ if st.button("Delete Dataset") and dataset_id_to_delete:
     try:
         # Convert input to integer for matching dataset_id
         dataset_id_to_delete = int(dataset_id_to_delete)
-        # Check if the dataset_id exists in the DataFrame
-        if dataset_id_to_delete in df_datasets_metadata["dataset_id"].values:
-            # Remove the row with the matching dataset_id
-            df_datasets_metadata = df_datasets_metadata[df_datasets_metadata["dataset_id"] != dataset_id_to_delete]
-            # Save the updated DataFrame to the CSV file
-            df_datasets_metadata.to_csv(DATASETS_METADATA_CSV_PATH, index=False)
-
-            # Update the session state with the new DataFrame
-            st.session_state.df_datasets_metadata = df_datasets_metadata
+        # Delete just this row in the database
+        if delete_dataset(dataset_id_to_delete):
+            dataset_sync.refresh()  # Drops just this row from the in-memory frame
+            df_datasets_metadata = dataset_sync.df
             st.success(f"✅ Dataset with ID {dataset_id_to_delete} has been deleted.")
         else:
             st.error(f"❌ Dataset ID {dataset_id_to_delete} not found.")
@@ -155,8 +123,8 @@ if st.button("Delete Dataset") and dataset_id_to_delete:
     except Exception as e:
         st.error(f"❌ Error while deleting dataset: {e}")
 
-# Bar chart for the number of rows per dataset
-rows_counts = df_datasets_metadata['rows'].value_counts()
+# Bar chart for the number of rows per dataset (counts come from the dataset_rollup table)
+rows_counts = dataset_counts("rows")
 
 # Create a bar chart using Plotly
 fig_bar = px.bar(
@@ -169,7 +137,7 @@ st.subheader("📊 Number of Rows per Dataset")
 st.plotly_chart(fig_bar)
 
 # Pie chart for the distribution of datasets by "uploaded_by"
-uploaded_by_counts = df_datasets_metadata['uploaded_by'].value_counts()
+uploaded_by_counts = dataset_counts("uploaded_by")
 
 # Create a pie chart using Plotly
 fig_pie = px.pie(
@@ -184,26 +152,20 @@ st.plotly_chart(fig_pie)
 # AI ASSISTANT for Datasets Metadata
 st.subheader("🤖 Datasets Metadata AI Assistant")
 
-dataset_text = df_datasets_metadata.head(40).to_csv(index=False)  # First 40 rows for AI input
-
-# Chat history for AI assistant
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "system",
-            "content": "You are a data expert assistant. Analyze datasets metadata and provide actionable insights."
-        }
-    ]
+# Chat history for AI assistant (this page's own; older turns are folded into a running summary)
+chat = get_conversation(
+    "datasets_metadata",
+    "You are a data expert assistant. Analyze datasets metadata and provide actionable insights."
+)
 
 # "Clear Chat" button
 if st.button("Clear Chat"):
-    st.session_state.messages = st.session_state.messages[:1]  # Keep only the system message
+    chat.clear()  # Keeps only the system prompt
     st.rerun()  # Rerun the app to reset the chat history
 
 # Display the chat history as new messages appear
-for msg in st.session_state.messages:
-    if msg["role"] != "system":
-        st.chat_message(msg["role"]).markdown(msg["content"])
+for msg in chat.transcript:
+    st.chat_message(msg["role"]).markdown(msg["content"])
 
 # New message input for the user
 prompt = st.chat_input("Ask the Dataset Metadata Assistant...")
@@ -213,29 +175,21 @@ if prompt:
     # Display the user's message in the chat box
     st.chat_message("user").markdown(prompt)
 
-    # Append the new user message to the session state
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    # Add the new user message to this page's conversation
+    chat.add("user", prompt)
 
-    api_messages = st.session_state.messages + [
-        {"role": "system", "content": f"Here is the dataset metadata (first 40 rows):\n\n{dataset_text}"}
-    ]
+    # Built only now: whole-table counts plus the datasets relevant to this question
+    context = build_context("datasets_metadata", prompt, df_datasets_metadata)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="openai/gpt-3.5-turbo",
-            messages=api_messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-
-        # Get the AI's response
-        ai_msg = response.choices[0].message["content"]
-
-        # Display the assistant's message in the chat box
-        st.chat_message("assistant").markdown(ai_msg)
-
-        # Append the assistant's response to the session state
-        st.session_state.messages.append({"role": "assistant", "content": ai_msg})
+        # Stream the AI's response into the chat box as it arrives (a repeated question comes from the cache)
+        tokens, from_cache = stream_answer(chat.api_messages(), context, temperature=0.7, max_tokens=500)
+        ai_msg = st.chat_message("assistant").write_stream(tokens)
+        if from_cache:
+            st.caption("Answered from cache (same question, unchanged data)")
+
+        # Add the assistant's response to the conversation
+        chat.add("assistant", ai_msg)
 
     except Exception as e:
         st.error(f"Error from OpenRouter API: {e}")
\ No newline at end of file
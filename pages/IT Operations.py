@@ -1,20 +1,38 @@
 import streamlit as st
 import pandas as pd
-import os
-import openai  # OpenRouter via OpenAI SDK
 import plotly.express as px  # For plotting charts
 
+from app.ai.assistant import get_conversation, stream_answer
+from app.ai.context import build_context
+from app.ai.similar import SimilarityIndex, matching_rows
+from app.data.cache import shared_frame
+from app.data.frame_search import search_frame
+from app.data.queries import distinct_values
+from app.data.rollups import ticket_counts
+from app.data.search import fts_available, search_tickets
+from app.data.tickets import (
+    TICKET_SORT_COLUMNS, add_ticket, count_tickets, create_it_tickets_table,
+    delete_ticket, query_tickets,
+)
+
 # Page title and icon
 st.set_page_config(
     page_title="IT Operations",
     page_icon="💻",
 )
 
-# DIRECTORY SAFETY for IT Tickets
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "DATA"))
-IT_TICKETS_CSV_PATH = os.path.join(DATA_DIR, "it_tickets.csv")
-os.makedirs(DATA_DIR, exist_ok=True)
+# DATABASE SAFETY for IT Tickets (runs once per server process, not on every rerun)
+@st.cache_resource
+def init_it_tickets_table():
+    create_it_tickets_table()
+
+init_it_tickets_table()
+
+
+# SIMILARITY INDEX over ticket text, memory-mapped and shared by every session
+@st.cache_resource
+def load_ticket_index():
+    return SimilarityIndex("it_tickets")
 
 # SESSION SAFETY (login check)
 if "logged_in" not in st.session_state:
@@ -28,54 +46,25 @@ if not st.session_state.logged_in or not st.session_state.username:
         st.switch_page("Home.py")
     st.stop()
 
-# OPENROUTER / OpenAI Client Configuration
+# OPENROUTER / OpenAI Client Configuration (the shared streaming client reads the key from secrets)
 if "OPENAI_API_KEY" not in st.secrets:
     st.error("API key is missing. Please set OPENAI_API_KEY in secrets.")
     st.stop()
 
-openrouter_api_key = st.secrets["OPENAI_API_KEY"]
-openai.api_key = openrouter_api_key
-openai.api_base = "https://openrouter.ai/api/v1"
-
-
-# LOAD IT TICKETS CSV
-@st.cache_data
-def load_it_tickets():
-    """Loads it_tickets.csv or returns an empty DataFrame."""
-    expected_cols = [
-        "ticket_id", "timestamp", "priority", "status",
-        "category", "subject", "description", "assigned_to"
-    ]
-
-    if not os.path.exists(IT_TICKETS_CSV_PATH):
-        st.warning(f"CSV not found at `{IT_TICKETS_CSV_PATH}` — creating a new one.")
-        df = pd.DataFrame(columns=expected_cols)
-        df.to_csv(IT_TICKETS_CSV_PATH, index=False)
-        return df
-
-    try:
-        df = pd.read_csv(IT_TICKETS_CSV_PATH)
-
-        # Ensure all expected columns exist
-        for col in expected_cols:
-            if col not in df.columns:
-                df[col] = None
-
-        # Fix timestamp
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-
-        return df
-
-    except Exception as e:
-        st.error(f"Failed to load CSV: {e}")
-        return pd.DataFrame(columns=expected_cols)
-
+# Filter drop-down options, cached until the tickets table changes
+@st.cache_data(max_entries=4)
+def load_ticket_filter_options(version):
+    return {
+        "priority": distinct_values("it_tickets", "priority"),
+        "status": distinct_values("it_tickets", "status"),
+        "assigned_to": distinct_values("it_tickets", "assigned_to"),
+    }
 
-# Load IT tickets into session
-if "df_it_tickets" not in st.session_state:
-    st.session_state.df_it_tickets = load_it_tickets()
 
-df_it_tickets = st.session_state.df_it_tickets
+# Load IT tickets once per server process; every session shares that one frame
+# and reruns merge in only the rows added or deleted since
+ticket_sync, _ = shared_frame("it_tickets")
+df_it_tickets = ticket_sync.df
 
 # IT Tickets PAGE UI
 st.title("📊 IT Tickets Records")
@@ -87,23 +76,77 @@ st.subheader("📋 IT Ticket Table")
 # Search functionality
 search_term = st.text_input("Search for an incident (subject, category, assigned_to, etc.):")
 
+# Filters and sorting (pushed down into SQL, only the visible page is fetched)
+filter_options = load_ticket_filter_options(ticket_sync.version)
+filter_col1, filter_col2, filter_col3 = st.columns(3)
+priority_filter = filter_col1.multiselect("Priority", filter_options["priority"])
+status_filter = filter_col2.multiselect("Status", filter_options["status"])
+assignee_filter = filter_col3.multiselect("Assigned To", filter_options["assigned_to"])
+date_range = st.date_input("Created between", value=())
+
+sort_col1, sort_col2, sort_col3 = st.columns(3)
+sort_by = sort_col1.selectbox("Sort by", TICKET_SORT_COLUMNS)
+descending = sort_col2.selectbox("Order", ["Descending", "Ascending"]) == "Descending"
+page_size = sort_col3.selectbox("Rows per page", [25, 50, 100], index=1)
+
 # Filtering the DataFrame based on the search term
 if search_term:
-    filtered_df = df_it_tickets[
-        df_it_tickets.apply(lambda row: row.astype(str).str.contains(search_term, case=False).any(), axis=1)
-    ]
+    if fts_available("it_tickets"):
+        # Ranked full-text lookup in the database instead of scanning every row
+        filtered_df = search_tickets(search_term)
+    else:
+        filtered_df = search_frame(df_it_tickets, search_term)  # Vectorised scan of the loaded frame
+
+    if not filtered_df.empty:
+        st.dataframe(filtered_df)  # Display filtered IT tickets
+    else:
+        st.warning("No incidents found matching the search criteria.")
 else:
-    filtered_df = df_it_tickets  # If no search term, show all tickets
-
-if not filtered_df.empty:
-    st.dataframe(filtered_df)  # Display filtered IT tickets
-else:
-    st.warning("No incidents found matching the search criteria.")
+    start_date, end_date = (tuple(date_range) + (None, None))[:2]  # 0, 1 or 2 dates picked
+    filters = {
+        "priority": priority_filter,
+        "status": status_filter,
+        "assigned_to": assignee_filter,
+        "start": start_date,
+        "end": end_date,
+    }
+
+    # New filters or sort order: go back to the first page
+    filter_key = (str(filters), sort_by, descending, page_size)
+    if st.session_state.get("ticket_filter_key") != filter_key:
+        st.session_state.ticket_filter_key = filter_key
+        st.session_state.ticket_cursors = [None]  # Cursor that starts each visited page
+
+    cursors = st.session_state.ticket_cursors
+    page_df, next_cursor = query_tickets(
+        **filters, sort_by=sort_by, descending=descending, after=cursors[-1], limit=page_size
+    )
+    total_matching = count_tickets(**filters)
+
+    # Display only the current page of IT tickets
+    if not page_df.empty:
+        page_df["created_at"] = pd.to_datetime(page_df["created_at"], errors="coerce")
+        st.dataframe(page_df)
+    else:
+        st.warning("No tickets match the selected filters.")
+
+    total_pages = max(1, -(-total_matching // page_size))
+    nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+    nav_info.caption(f"Page {len(cursors)} of {total_pages} · {total_matching} matching tickets")
+    if nav_prev.button("◀ Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if nav_next.button("Next ▶", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
 
 # BUTTON TO REFRESH THE TABLE
 if st.button("Refresh IT Tickets Table"):
-    st.session_state.df_it_tickets = load_it_tickets()  # Reload tickets from CSV
-    st.success("IT Tickets Table has been refreshed.")
+    sync_stats = ticket_sync.refresh()  # Fetches only new rows and tombstoned IDs
+    df_it_tickets = ticket_sync.df
+    st.success(
+        f"IT Tickets Table has been refreshed ({sync_stats['added']} added, {sync_stats['updated']} updated, {sync_stats['removed']} removed)."
+    )
 
 # ADD TICKET FORM
 st.subheader("➕ Add New IT Ticket")
@@ -122,25 +165,21 @@ with st.form(key="add_ticket_form"):
                     ticket_description]):
             st.error("❌ All fields are required.")
         else:
-            new_ticket = {
-                "ticket_id": int(df_it_tickets["ticket_id"].max() + 1) if not df_it_tickets.empty else 1000,
-                "timestamp": pd.to_datetime("now"),
-                "priority": ticket_priority,
-                "status": ticket_status,
-                "category": ticket_category,
-                "subject": ticket_subject,
-                "assigned_to": ticket_assigned_to,
-                "description": ticket_description
-            }
-
-            new_ticket_df = pd.DataFrame([new_ticket])
-            df_it_tickets = pd.concat([df_it_tickets, new_ticket_df], ignore_index=True)
-
-            df_it_tickets["timestamp"] = pd.to_datetime(df_it_tickets["timestamp"], errors="coerce")
-            df_it_tickets.to_csv(IT_TICKETS_CSV_PATH, index=False)
-
-            # Update the session state
-            st.session_state.df_it_tickets = df_it_tickets
+            created_at = pd.Timestamp.now().floor("s")
+
+            # Single-row INSERT; the database allocates the ticket_id
+            add_ticket(
+                priority=ticket_priority,
+                status=ticket_status,
+                category=ticket_category,
+                subject=ticket_subject,
+                description=ticket_description,
+                assigned_to=ticket_assigned_to,
+                created_at=created_at.strftime("%Y-%m-%d %H:%M:%S")
+            )
+
+            ticket_sync.refresh()  # Appends just the new row to the in-memory frame
+            df_it_tickets = ticket_sync.df
             st.success("✅ Ticket added successfully!")
 
 # DELETE TICKET FEATURE
@@ -152,15 +191,10 @@ if st.button("Delete Ticket") and ticket_id_to_delete:
     try:
         # Convert input to integer for matching ticket_id
         ticket_id_to_delete = int(ticket_id_to_delete)
-        # Check if the ticket_id exists in the DataFrame
-        if ticket_id_to_delete in df_it_tickets["ticket_id"].values:
-            # Remove the row with the matching ticket_id
-            df_it_tickets = df_it_tickets[df_it_tickets["ticket_id"] != ticket_id_to_delete]
-            # Save the updated DataFrame to the CSV file
-            df_it_tickets.to_csv(IT_TICKETS_CSV_PATH, index=False)
-
-            # Update the session state with the new DataFrame
-            st.session_state.df_it_tickets = df_it_tickets
+        # Delete just this row in the database
+        if delete_ticket(ticket_id_to_delete):
+            ticket_sync.refresh()  # Drops just this row from the in-memory frame
+            df_it_tickets = ticket_sync.df
             st.success(f"✅ Ticket with ID {ticket_id_to_delete} has been deleted.")
         else:
             st.error(f"❌ Ticket ID {ticket_id_to_delete} not found.")
@@ -169,29 +203,43 @@ if st.button("Delete Ticket") and ticket_id_to_delete:
     except Exception as e:
         st.error(f"❌ Error while deleting ticket: {e}")
 
+# SIMILAR TICKETS
+st.subheader("🔎 Find Similar Tickets")
+
+similar_query = st.text_input("Ticket ID or a description to match:")
+
+if similar_query:
+    ticket_index = load_ticket_index()
+    ticket_index.update()  # Embeds only rows added (and drops rows deleted) since the last lookup
+    if similar_query.strip().isdigit():
+        matches = ticket_index.similar_to(int(similar_query))
+    else:
+        matches = ticket_index.query([similar_query])[0]
+
+    if matches is None:
+        st.error(f"❌ Ticket ID {similar_query.strip()} not found.")
+    elif matches:
+        st.dataframe(matching_rows(df_it_tickets, "it_tickets", matches))
+    else:
+        st.warning("No similar tickets found.")
+
 # AI ASSISTANT for IT Tickets
 st.subheader("🤖 IT Tickets AI Assistant")
 
-ticket_text = df_it_tickets.head(40).to_csv(index=False)  # First 40 rows for AI input
-
-# Chat history for AI assistant
-if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "system",
-            "content": "You are an IT support assistant. Analyze IT tickets and provide suggestions."
-        }
-    ]
+# Chat history for AI assistant (this page's own; older turns are folded into a running summary)
+chat = get_conversation(
+    "it_tickets",
+    "You are an IT support assistant. Analyze IT tickets and provide suggestions."
+)
 
 # "Clear Chat" button
 if st.button("Clear Chat"):
-    st.session_state.messages = st.session_state.messages[:1]  # Keep only the system message
+    chat.clear()  # Keeps only the system prompt
     st.rerun()  # Rerun the app to reset the chat history
 
 # Display the chat history as new messages appear
-for msg in st.session_state.messages:
-    if msg["role"] != "system":
-        st.chat_message(msg["role"]).markdown(msg["content"])
+for msg in chat.transcript:
+    st.chat_message(msg["role"]).markdown(msg["content"])
 
 # New message input for the user
 prompt = st.chat_input("Ask the IT Assistant...")
@@ -201,37 +249,29 @@ if prompt:
     # Display the user's message in the chat box
     st.chat_message("user").markdown(prompt)
 
-    # Append the new user message to the session state
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    # Add the new user message to this page's conversation
+    chat.add("user", prompt)
 
-    api_messages = st.session_state.messages + [
-        {"role": "system", "content": f"Here is the IT tickets dataset (first 40 rows):\n\n{ticket_text}"}
-    ]
+    # Built only now: whole-table counts plus the tickets relevant to this question
+    context = build_context("it_tickets", prompt, df_it_tickets)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="openai/gpt-3.5-turbo",
-            messages=api_messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-
-        # Get the AI's response
-        ai_msg = response.choices[0].message["content"]
-
-        # Display the assistant's message in the chat box
-        st.chat_message("assistant").markdown(ai_msg)
+        # Stream the AI's response into the chat box as it arrives (a repeated question comes from the cache)
+        tokens, from_cache = stream_answer(chat.api_messages(), context, temperature=0.7, max_tokens=500)
+        ai_msg = st.chat_message("assistant").write_stream(tokens)
+        if from_cache:
+            st.caption("Answered from cache (same question, unchanged data)")
 
-        # Append the assistant's response to the session state
-        st.session_state.messages.append({"role": "assistant", "content": ai_msg})
+        # Add the assistant's response to the conversation
+        chat.add("assistant", ai_msg)
 
     except Exception as e:
         st.error(f"Error from OpenRouter API: {e}")
 
 # --- Added Bar and Pie Charts at the Bottom of the Page ---
 
-# Bar chart for IT ticket priority distribution
-priority_counts = df_it_tickets['priority'].value_counts()
+# Bar chart for IT ticket priority distribution (counts come from the ticket_rollup table)
+priority_counts = ticket_counts("priority")
 
 # Plot the bar chart for priority distribution
 fig_bar = px.bar(
@@ -243,7 +283,7 @@ fig_bar = px.bar(
 st.plotly_chart(fig_bar)
 
 # Pie chart for IT ticket status distribution
-status_counts = df_it_tickets['status'].value_counts()
+status_counts = ticket_counts("status")
 
 # Plot the pie chart for status distribution
 fig_pie = px.pie(